@@ -0,0 +1,283 @@
+"""Shared state backends for running several app workers.
+
+MYTH_OR_FACT_BACKEND selects where session snapshots, classroom state and
+card statistics live:
+
+    memory://                 this process only (default, development)
+    sqlite:///path/state.db   every worker on one machine (an absolute path;
+                              sqlite://state.db is relative to the
+                              working directory)
+    redis://host:6379/0       every worker behind the load balancer
+    fakeredis://              in-process Redis stand-in for tests
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterator, Optional
+
+DEFAULT_BACKEND = os.environ.get("MYTH_OR_FACT_BACKEND", "memory://")
+# Connections per worker process for the SQLite backend.
+SQLITE_POOL_SIZE = 4
+
+
+class Backend(ABC):
+    # `shared` is False when state stays inside one process, so callers can
+    # keep their in-process structures instead of going through the backend.
+    shared = True
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def hgetall(self, key: str) -> Dict[str, str]:
+        ...
+
+    @abstractmethod
+    def hset(self, key: str, mapping: Dict[str, str], ttl: Optional[int] = None) -> None:
+        ...
+
+    @abstractmethod
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        ...
+
+
+class MemoryBackend(Backend):
+    shared = False
+
+    def __init__(self) -> None:
+        self._values: Dict[str, object] = {}
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[object]:
+        expires = self._expires.get(key)
+        if expires is not None and expires < time.time():
+            self._values.pop(key, None)
+            self._expires.pop(key, None)
+        return self._values.get(key)
+
+    def _expire(self, key: str, ttl: Optional[int]) -> None:
+        if ttl:
+            self._expires[key] = time.time() + ttl
+        else:
+            self._expires.pop(key, None)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._live(key)
+        return value if isinstance(value, str) else None
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        with self._lock:
+            self._values[key] = value
+            self._expire(key, ttl)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._values.pop(key, None)
+            self._expires.pop(key, None)
+
+    def hgetall(self, key: str) -> Dict[str, str]:
+        with self._lock:
+            value = self._live(key)
+            return {field: str(item) for field, item in value.items()} if isinstance(value, dict) else {}
+
+    def hset(self, key: str, mapping: Dict[str, str], ttl: Optional[int] = None) -> None:
+        with self._lock:
+            value = self._live(key)
+            if not isinstance(value, dict):
+                value = self._values[key] = {}
+            value.update({field: str(item) for field, item in mapping.items()})
+            self._expire(key, ttl)
+
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        with self._lock:
+            value = self._live(key)
+            if not isinstance(value, dict):
+                value = self._values[key] = {}
+            value[field] = str(int(value.get(field, 0)) + amount)
+            return int(value[field])
+
+
+@contextmanager
+def _transaction(connection: sqlite3.Connection) -> Iterator[None]:
+    # Pool connections run in autocommit mode, where `with connection:` opens
+    # no transaction. IMMEDIATE takes the write lock up front, so the
+    # statements inside commit together or not at all.
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+        connection.execute("COMMIT")
+    except BaseException:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+
+
+class SQLiteBackend(Backend):
+    # A small pool of connections shared by every thread. Streamlit runs most
+    # reruns on a fresh thread, so per-thread connections would be opened,
+    # and their pragmas rerun, on nearly every rerun. WAL lets every worker
+    # read while one writes.
+    def __init__(self, path: str, pool_size: int = SQLITE_POOL_SIZE) -> None:
+        self.path = path
+        self.pool_size = pool_size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        with self._conn() as connection:
+            connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL);
+                CREATE TABLE IF NOT EXISTS kv_hash (
+                    key TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    PRIMARY KEY (key, field)
+                );
+                CREATE TABLE IF NOT EXISTS kv_hash_expiry (key TEXT PRIMARY KEY, expires_at REAL NOT NULL);
+                """
+            )
+
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        # Opens connections on demand up to the pool size, then waits for an
+        # idle one.
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self.pool_size
+                if can_open:
+                    self._opened += 1
+            connection = self._open() if can_open else self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put(connection)
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, isolation_level=None, timeout=10, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def get(self, key: str) -> Optional[str]:
+        with self._conn() as connection:
+            row = connection.execute(
+                "SELECT value FROM kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        expires_at = time.time() + ttl if ttl else None
+        with self._conn() as connection:
+            connection.execute("INSERT OR REPLACE INTO kv VALUES (?, ?, ?)", (key, value, expires_at))
+
+    def delete(self, key: str) -> None:
+        with self._conn() as connection:
+            self._delete(connection, key)
+
+    def _delete(self, connection: sqlite3.Connection, key: str) -> None:
+        with _transaction(connection):
+            connection.execute("DELETE FROM kv WHERE key = ?", (key,))
+            connection.execute("DELETE FROM kv_hash WHERE key = ?", (key,))
+            connection.execute("DELETE FROM kv_hash_expiry WHERE key = ?", (key,))
+
+    def hgetall(self, key: str) -> Dict[str, str]:
+        with self._conn() as connection:
+            expiry = connection.execute("SELECT expires_at FROM kv_hash_expiry WHERE key = ?", (key,)).fetchone()
+            if expiry and expiry[0] < time.time():
+                self._delete(connection, key)
+                return {}
+            return dict(connection.execute("SELECT field, value FROM kv_hash WHERE key = ?", (key,)))
+
+    def hset(self, key: str, mapping: Dict[str, str], ttl: Optional[int] = None) -> None:
+        with self._conn() as connection, _transaction(connection):
+            connection.executemany(
+                "INSERT OR REPLACE INTO kv_hash VALUES (?, ?, ?)",
+                [(key, field, str(value)) for field, value in mapping.items()],
+            )
+            if ttl:
+                connection.execute("INSERT OR REPLACE INTO kv_hash_expiry VALUES (?, ?)", (key, time.time() + ttl))
+
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        with self._conn() as connection, _transaction(connection):
+            row = connection.execute(
+                """
+                INSERT INTO kv_hash VALUES (?, ?, ?)
+                ON CONFLICT (key, field) DO UPDATE SET value = CAST(value AS INTEGER) + excluded.value
+                RETURNING value
+                """,
+                (key, field, str(amount)),
+            ).fetchone()
+        return int(row[0])
+
+
+class RedisBackend(Backend):
+    def __init__(self, client) -> None:
+        # redis-py clients are thread-safe and draw connections from the pool
+        # they were built with, so one client per worker is enough.
+        self.client = client
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None) -> None:
+        self.client.set(key, value, ex=ttl)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def hgetall(self, key: str) -> Dict[str, str]:
+        return self.client.hgetall(key)
+
+    def hset(self, key: str, mapping: Dict[str, str], ttl: Optional[int] = None) -> None:
+        pipeline = self.client.pipeline()
+        pipeline.hset(key, mapping={field: str(value) for field, value in mapping.items()})
+        if ttl:
+            pipeline.expire(key, ttl)
+        pipeline.execute()
+
+    def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        return int(self.client.hincrby(key, field, amount))
+
+
+@lru_cache(maxsize=None)
+def open_backend(url: str = DEFAULT_BACKEND) -> Backend:
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith("sqlite://"):
+        # As with file:// URLs, the path starts after the "//", so
+        # sqlite:///var/lib/state.db is absolute.
+        return SQLiteBackend(url[len("sqlite://"):])
+    if url.startswith("fakeredis://"):
+        try:
+            import fakeredis
+        except ImportError as exc:
+            raise RuntimeError(
+                "fakeredis:// needs the fakeredis package (pip install -r requirements-backends.txt)"
+            ) from exc
+        return RedisBackend(fakeredis.FakeRedis(decode_responses=True))
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError(f"{url} needs the redis package (pip install -r requirements-backends.txt)") from exc
+        return RedisBackend(redis.Redis(connection_pool=redis.ConnectionPool.from_url(url, decode_responses=True)))
+    raise ValueError(f"unknown backend URL {url!r}")
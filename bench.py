@@ -0,0 +1,254 @@
+"""Headless benchmark for the Streamlit page.
+
+Each scenario plays full rounds of myth_or_fact.py through Streamlit's
+AppTest runner (start, answer, flip, next, play again), one process per
+concurrent session, and reports rerun latency percentiles, delta bytes per interaction and
+session-state memory. Corpora larger than the bundled pack are synthesised
+and compiled into temporary .mfpack files.
+
+Usage:
+
+    python bench.py                          # default matrix
+    python bench.py --cards 47 10000 --sessions 1 16
+    python bench.py --save bench_baseline.json
+    python bench.py --check bench_baseline.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from cards import DEFAULT_PACK, Card, load_cards
+from cardpack import compile_pack
+
+APP_PATH = Path(__file__).resolve().parent / "myth_or_fact.py"
+DEFAULT_CARD_COUNTS = (len(load_cards()), 10_000, 100_000)
+DEFAULT_SESSION_COUNTS = (1, 8)
+# Metrics where a larger value is a regression, checked against a baseline.
+CHECKED_METRICS = ("p95_ms", "p99_ms", "delta_bytes_per_interaction", "session_bytes")
+
+
+def synthetic_cards(count: int) -> Iterator[Card]:
+    base = load_cards()
+    for card_id in range(count):
+        card = base[card_id % len(base)]
+        yield Card(
+            id=card_id,
+            statement=f"{card.statement} (#{card_id})",
+            label=card.label,
+            explanation=card.explanation,
+            discussion=card.discussion,
+            tags=card.tags,
+        )
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def deep_sizeof(value: object, seen: Optional[set] = None) -> int:
+    seen = seen if seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in value)
+    for slot in getattr(type(value), "__slots__", ()):
+        if hasattr(value, slot):
+            size += deep_sizeof(getattr(value, slot), seen)
+    if hasattr(value, "__dict__"):
+        size += deep_sizeof(vars(value), seen)
+    return size
+
+
+class DeltaCounter:
+    # Counts the serialized size of every ForwardMsg the runtime would send.
+    def __init__(self) -> None:
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def install(self) -> None:
+        from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+
+        enqueue = ForwardMsgQueue.enqueue
+        counter = self
+
+        def counting_enqueue(queue, msg):
+            with counter._lock:
+                counter.bytes += msg.ByteSize()
+            return enqueue(queue, msg)
+
+        ForwardMsgQueue.enqueue = counting_enqueue
+
+
+def play_session(rounds: int, seed: int, latencies: List[float], interactions: List[int]) -> int:
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed)
+    app = AppTest.from_file(str(APP_PATH), default_timeout=60)
+    app.run()
+
+    def click(label: str) -> None:
+        button = next(b for b in app.button if b.label == label)
+        started = time.perf_counter()
+        button.click().run()
+        latencies.append(time.perf_counter() - started)
+        interactions.append(1)
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+
+    for _ in range(rounds):
+        while not any(b.label == "🔄 Play Again" for b in app.button):
+            click(rng.choice(("🧠 Myth", "📘 Fact")))
+            if rng.random() < 0.5:
+                click("🔁 Flip Card")
+            click("➡️ Next Card")
+        click("🔄 Play Again")
+    return deep_sizeof(app.session_state.to_dict())
+
+
+def run_worker(rounds: int, seed: int) -> Dict[str, object]:
+    # One session per process: AppTest is not thread-safe, so concurrent
+    # sessions are separate worker processes run side by side.
+    counter = DeltaCounter()
+    counter.install()
+    latencies: List[float] = []
+    interactions: List[int] = []
+    started = time.perf_counter()
+    session_bytes = play_session(rounds, seed, latencies, interactions)
+    return {
+        "latencies": latencies,
+        "elapsed": time.perf_counter() - started,
+        "delta_bytes": counter.bytes,
+        "session_bytes": session_bytes,
+    }
+
+
+def run_scenario(pack: str, cards: int, sessions: int, rounds: int, workdir: str) -> Dict[str, float]:
+    # Progress, the event log and metrics go to the scenario's own directory,
+    # never to the app's real ones.
+    state_dir = tempfile.mkdtemp(prefix=f"bench-{cards}x{sessions}-", dir=workdir)
+    env = dict(
+        os.environ,
+        MYTH_OR_FACT_PACK=pack,
+        MYTH_OR_FACT_DB=os.path.join(state_dir, "progress.db"),
+        MYTH_OR_FACT_LOG_DIR=os.path.join(state_dir, "logs"),
+        MYTH_OR_FACT_METRICS_FILE=os.path.join(state_dir, "metrics.prom"),
+        MYTH_OR_FACT_PROFILE_DIR=os.path.join(state_dir, "profiles"),
+    )
+    workers = [
+        subprocess.Popen(
+            [sys.executable, __file__, "--worker", "--seed", str(seed), "--rounds", str(rounds)],
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        for seed in range(sessions)
+    ]
+    runs = []
+    for worker in workers:
+        output, errors = worker.communicate()
+        if worker.returncode:
+            raise RuntimeError(f"a benchmark session failed:\n{errors}")
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    latencies = [latency for run in runs for latency in run["latencies"]]
+    return {
+        "cards": cards,
+        "sessions": sessions,
+        "interactions": len(latencies),
+        "interactions_per_sec": len(latencies) / max(run["elapsed"] for run in runs),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "delta_bytes_per_interaction": sum(run["delta_bytes"] for run in runs) / len(latencies),
+        "session_bytes": statistics.fmean(run["session_bytes"] for run in runs),
+    }
+
+
+def scenario_key(result: Dict[str, float]) -> str:
+    return f"{int(result['cards'])}x{int(result['sessions'])}"
+
+
+def check_baseline(results: List[Dict[str, float]], baseline_path: str, tolerance: float) -> List[str]:
+    with open(baseline_path, encoding="utf-8") as handle:
+        baseline = {scenario_key(row): row for row in json.load(handle)["results"]}
+    failures = []
+    for result in results:
+        expected = baseline.get(scenario_key(result))
+        if expected is None:
+            continue
+        for metric in CHECKED_METRICS:
+            limit = expected[metric] * (1 + tolerance)
+            if result[metric] > limit:
+                failures.append(
+                    f"{scenario_key(result)} {metric}: {result[metric]:.1f} > {limit:.1f} "
+                    f"(baseline {expected[metric]:.1f})"
+                )
+    return failures
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark rerun latency and session memory of the app.")
+    parser.add_argument("--cards", type=int, nargs="+", default=list(DEFAULT_CARD_COUNTS))
+    parser.add_argument("--sessions", type=int, nargs="+", default=list(DEFAULT_SESSION_COUNTS))
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--check", metavar="PATH", help="fail if results regress against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression ratio for --check")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--seed", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.rounds, args.seed)))
+        return 0
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for cards in args.cards:
+            pack = str(DEFAULT_PACK)
+            if cards != len(load_cards()):
+                pack = os.path.join(workdir, f"bench-{cards}.mfpack")
+                compile_pack(synthetic_cards(cards), pack)
+            for sessions in args.sessions:
+                result = run_scenario(pack, cards, sessions, args.rounds, workdir)
+                results.append(result)
+                print(
+                    f"{cards:>7} cards {sessions:>3} sessions  "
+                    f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+                    f"p99 {result['p99_ms']:7.1f} ms  "
+                    f"{result['delta_bytes_per_interaction']:8.0f} B/interaction  "
+                    f"{result['session_bytes']:7.0f} B/session"
+                )
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as handle:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, handle, indent=2)
+        print(f"saved baseline to {args.save}")
+    if args.check:
+        failures = check_baseline(results, args.check, args.tolerance)
+        for failure in failures:
+            print(f"REGRESSION {failure}", file=sys.stderr)
+        if failures:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import threading
+from typing import Dict, List, Union
+
+from backends import Backend
+
+
+class CardCounters:
+    __slots__ = ("answers", "misses", "answer_seconds", "timed_answers", "flips")
+
+    def __init__(self) -> None:
+        self.answers = 0
+        self.misses = 0
+        self.answer_seconds = 0.0
+        self.timed_answers = 0
+        self.flips = 0
+
+
+class CardStats:
+    # Running per-card counters shared by every session in the process. Each
+    # update is O(1), so reading the dashboard never scans answer history.
+    def __init__(self) -> None:
+        self._cards: Dict[int, CardCounters] = {}
+        self._lock = threading.Lock()
+
+    def _counters(self, card_id: int) -> CardCounters:
+        counters = self._cards.get(card_id)
+        if counters is None:
+            counters = self._cards.setdefault(card_id, CardCounters())
+        return counters
+
+    def record_answer(self, card_id: int, correct: bool, seconds: float = 0.0) -> None:
+        with self._lock:
+            counters = self._counters(card_id)
+            counters.answers += 1
+            counters.misses += not correct
+            if seconds > 0:
+                counters.answer_seconds += seconds
+                counters.timed_answers += 1
+
+    def record_flip(self, card_id: int) -> None:
+        with self._lock:
+            self._counters(card_id).flips += 1
+
+    def rows(self) -> List[Dict[str, float]]:
+        with self._lock:
+            snapshot = [
+                (card_id, c.answers, c.misses, c.answer_seconds, c.timed_answers, c.flips)
+                for card_id, c in self._cards.items()
+            ]
+        return [
+            {
+                "card_id": card_id,
+                "answers": answers,
+                "miss_rate": misses / answers if answers else 0.0,
+                "mean_seconds": seconds / timed if timed else 0.0,
+                "flip_rate": flips / answers if answers else 0.0,
+            }
+            for card_id, answers, misses, seconds, timed, flips in snapshot
+        ]
+
+
+CARD_STATS = CardStats()
+
+
+class BackendCardStats:
+    # The same counters kept in a shared backend, one hash per counter keyed by
+    # card id, so every worker process adds to and reads the same numbers.
+    FIELDS = ("answers", "misses", "answer_ms", "timed", "flips")
+
+    def __init__(self, backend: Backend) -> None:
+        self.backend = backend
+
+    def record_answer(self, card_id: int, correct: bool, seconds: float = 0.0) -> None:
+        field = str(card_id)
+        self.backend.hincrby("stats:answers", field)
+        if not correct:
+            self.backend.hincrby("stats:misses", field)
+        if seconds > 0:
+            self.backend.hincrby("stats:answer_ms", field, int(seconds * 1000))
+            self.backend.hincrby("stats:timed", field)
+
+    def record_flip(self, card_id: int) -> None:
+        self.backend.hincrby("stats:flips", str(card_id))
+
+    def rows(self) -> List[Dict[str, float]]:
+        answers, misses, answer_ms, timed, flips = (self.backend.hgetall(f"stats:{name}") for name in self.FIELDS)
+        rows = []
+        for field, count in answers.items():
+            count = int(count)
+            timed_count = int(timed.get(field, 0))
+            rows.append(
+                {
+                    "card_id": int(field),
+                    "answers": count,
+                    "miss_rate": int(misses.get(field, 0)) / count if count else 0.0,
+                    "mean_seconds": int(answer_ms.get(field, 0)) / 1000 / timed_count if timed_count else 0.0,
+                    "flip_rate": int(flips.get(field, 0)) / count if count else 0.0,
+                }
+            )
+        return rows
+
+
+def open_card_stats(backend: Backend) -> Union[CardStats, BackendCardStats]:
+    return BackendCardStats(backend) if backend.shared else CARD_STATS
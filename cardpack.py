@@ -0,0 +1,267 @@
+"""Compiled card packs.
+
+Layout (little-endian):
+
+    header   magic, version, card count, records offset, strings offset
+    records  one fixed-width record per card: id, label and (offset, length)
+             pairs into the string table for statement, explanation, the
+             newline-joined discussion prompts and the newline-joined tags
+             (version 1 packs have no tags)
+    strings  UTF-8 string table, identical strings stored once
+
+Usage:
+
+    python cardpack.py compile packs/core.jsonl extra.csv -o packs/core.mfpack
+    python cardpack.py validate packs/core.jsonl
+"""
+
+import argparse
+import hashlib
+import mmap
+import os
+import shutil
+import sqlite3
+import struct
+import sys
+import tempfile
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, overload
+
+from cards import LABELS, Card, PackError, read_cards
+
+MAGIC = b"MOFP"
+VERSION = 2
+HEADER = struct.Struct("<4sHxxIQQ")
+RECORD = struct.Struct("<IB3x8I")
+RECORDS = {1: struct.Struct("<IB3x6I"), 2: RECORD}
+ID = struct.Struct("<I")
+# Page cache for PackWriter's id and string index; the rest stays on disk.
+INDEX_CACHE_KB = 8192
+
+
+class CardPack(Sequence[Card]):
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as handle:
+            size = os.fstat(handle.fileno()).st_size
+            if size < HEADER.size:
+                raise PackError(f"{path}: not a card pack")
+            self._buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, records_at, strings_at = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise PackError(f"{path}: not a card pack")
+        if version not in RECORDS:
+            raise PackError(f"{path}: unsupported pack version {version}")
+        self._record = RECORDS[version]
+        # A pack caught half-written must fail here, not on a later read.
+        if not HEADER.size <= records_at <= records_at + count * self._record.size <= strings_at <= size:
+            self._buffer.close()
+            raise PackError(f"{path}: truncated or corrupt pack")
+        self._count = count
+        self._records_at = records_at
+        self._strings_at = strings_at
+
+    def __len__(self) -> int:
+        return self._count
+
+    @overload
+    def __getitem__(self, position: int) -> Card: ...
+
+    @overload
+    def __getitem__(self, position: slice) -> List[Card]: ...
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(self._count))]
+        if position < 0:
+            position += self._count
+        if not 0 <= position < self._count:
+            raise IndexError("card position out of range")
+        fields = self._record.unpack_from(self._buffer, self._records_at + position * self._record.size)
+        card_id, label, st_at, st_len, ex_at, ex_len, di_at, di_len, *tags_field = fields
+        return Card(
+            id=card_id,
+            statement=self._string(st_at, st_len),
+            label=LABELS[label],
+            explanation=self._string(ex_at, ex_len),
+            discussion=self._lines(di_at, di_len),
+            tags=self._lines(*tags_field) if tags_field else (),
+        )
+
+    def id_at(self, position: int) -> int:
+        return ID.unpack_from(self._buffer, self._records_at + position * self._record.size)[0]
+
+    def label_at(self, position: int) -> str:
+        # Reads a single byte of the record without decoding any text.
+        return LABELS[self._buffer[self._records_at + position * self._record.size + 4]]
+
+    def tags_at(self, position: int) -> Tuple[str, ...]:
+        # Decodes only the tags string, for building tag indexes.
+        if self._record is not RECORD:
+            return ()
+        return self._lines(*self._record.unpack_from(self._buffer, self._records_at + position * RECORD.size)[-2:])
+
+    def _lines(self, offset: int, length: int) -> Tuple[str, ...]:
+        text = self._string(offset, length)
+        return tuple(text.split("\n")) if text else ()
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._strings_at + offset
+        return self._buffer[start:start + length].decode("utf-8")
+
+    def close(self) -> None:
+        self._buffer.close()
+
+
+# A card ready for the pack: id, label index and (digest, UTF-8 bytes) for
+# statement, explanation, discussion and tags. Building one needs no shared
+# state, so importers can encode cards in worker processes.
+EncodedCard = Tuple[int, int, Tuple[Tuple[bytes, bytes], ...]]
+
+
+def encode_card(card: Card) -> EncodedCard:
+    texts = (card.statement, card.explanation, "\n".join(card.discussion), "\n".join(card.tags))
+    strings = []
+    for text in texts:
+        data = text.encode("utf-8")
+        strings.append((hashlib.blake2b(data, digest_size=16).digest(), data))
+    return card.id, LABELS.index(card.label), tuple(strings)
+
+
+class PackWriter:
+    # Records and strings are spooled to temporary files as cards arrive, so
+    # card text is never held in memory. The card ids seen, to reject
+    # duplicates, and each distinct string's digest and offset, to store
+    # identical strings once, live in a temporary on-disk SQLite database
+    # whose page cache is capped at INDEX_CACHE_KB, so memory stays flat
+    # however many cards are added. The pack itself is written on close.
+    def __init__(self, output: str) -> None:
+        self.output = output
+        self.count = 0
+        self._strings_size = 0
+        self._records = tempfile.TemporaryFile()
+        self._strings = tempfile.TemporaryFile()
+        # An empty filename opens a private database that SQLite deletes
+        # when the connection closes.
+        self._index = sqlite3.connect("")
+        self._index.execute(f"PRAGMA cache_size = -{INDEX_CACHE_KB}")
+        self._index.execute("PRAGMA journal_mode = OFF")
+        self._index.execute("PRAGMA synchronous = OFF")
+        self._index.execute("CREATE TABLE ids (id INTEGER PRIMARY KEY)")
+        self._index.execute("CREATE TABLE strings (digest BLOB PRIMARY KEY, offset INTEGER NOT NULL) WITHOUT ROWID")
+
+    def __enter__(self) -> "PackWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._discard()
+
+    def add(self, card: Card) -> None:
+        self.add_encoded(encode_card(card))
+
+    def add_encoded(self, encoded: EncodedCard) -> None:
+        # Raises PackError for a card id already added, before anything is
+        # written, so callers can report the card and carry on.
+        card_id, label, strings = encoded
+        if not self._index.execute("INSERT OR IGNORE INTO ids VALUES (?)", (card_id,)).rowcount:
+            raise PackError(f"duplicate card id {card_id}")
+        fields: List[int] = []
+        for digest, data in strings:
+            offset = self._strings_size
+            if self._index.execute("INSERT OR IGNORE INTO strings VALUES (?, ?)", (digest, offset)).rowcount:
+                self._strings.write(data)
+                self._strings_size += len(data)
+            else:
+                offset = self._index.execute("SELECT offset FROM strings WHERE digest = ?", (digest,)).fetchone()[0]
+            fields += (offset, len(data))
+        self._records.write(RECORD.pack(card_id, label, *fields))
+        self.count += 1
+
+    def close(self) -> None:
+        # Written beside the target and renamed over it, never rewritten in
+        # place: a running app may have the old pack memory-mapped, and
+        # truncating that file under it kills the process with SIGBUS.
+        records_at = HEADER.size
+        strings_at = records_at + self.count * RECORD.size
+        directory, name = os.path.split(os.path.abspath(self.output))
+        handle = tempfile.NamedTemporaryFile(dir=directory, prefix=f".{name}.", suffix=".tmp", delete=False)
+        try:
+            with handle:
+                handle.write(HEADER.pack(MAGIC, VERSION, self.count, records_at, strings_at))
+                for spool in (self._records, self._strings):
+                    spool.seek(0)
+                    shutil.copyfileobj(spool, handle)
+            os.replace(handle.name, self.output)
+        except BaseException:
+            os.unlink(handle.name)
+            raise
+        finally:
+            self._discard()
+
+    def _discard(self) -> None:
+        self._records.close()
+        self._strings.close()
+        self._index.close()
+
+
+def compile_pack(cards: Iterable[Card], output: str) -> int:
+    with PackWriter(output) as writer:
+        for card in cards:
+            writer.add(card)
+    return writer.count
+
+
+def iter_sources(paths: Iterable[str]) -> Iterator[Card]:
+    for path in paths:
+        yield from read_cards(path)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate and compile Myth or Fact card packs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compile_cmd = commands.add_parser("compile", help="compile JSONL/CSV sources into a .mfpack")
+    compile_cmd.add_argument("sources", nargs="+")
+    compile_cmd.add_argument("-o", "--output", required=True)
+    compile_cmd.add_argument(
+        "--collapse-duplicates",
+        action="store_true",
+        help="drop near-duplicate statements, keeping the first (see dedup.py)",
+    )
+    compile_cmd.add_argument("--duplicates-report", help="write near-duplicate clusters to this CSV")
+    validate_cmd = commands.add_parser("validate", help="check JSONL/CSV sources without writing a pack")
+    validate_cmd.add_argument("sources", nargs="+")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "compile":
+            cards: Iterable[Card] = iter_sources(args.sources)
+            if args.collapse_duplicates or args.duplicates_report:
+                from dedup import collapse, find_duplicates, write_report
+
+                cards = list(cards)
+                clusters = find_duplicates([card.statement for card in cards], [card.label for card in cards])
+                if args.duplicates_report:
+                    write_report(args.duplicates_report, cards, clusters)
+                if args.collapse_duplicates:
+                    cards = list(collapse(cards, clusters))
+                conflicts = sum(cluster.conflict for cluster in clusters)
+                print(f"found {len(clusters)} near-duplicate clusters, {conflicts} with conflicting labels")
+            count = compile_pack(cards, args.output)
+            print(f"compiled {count} cards into {args.output}")
+        else:
+            ids = set()
+            for card in iter_sources(args.sources):
+                if card.id in ids:
+                    raise PackError(f"duplicate card id {card.id}")
+                ids.add(card.id)
+            print(f"{len(ids)} cards OK")
+    except PackError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
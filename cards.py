@@ -0,0 +1,105 @@
+import csv
+import json
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, Sequence, Tuple
+
+PACK_DIR = Path(__file__).resolve().parent / "packs"
+DEFAULT_PACK = Path(os.environ.get("MYTH_OR_FACT_PACK", PACK_DIR / "core.jsonl"))
+
+LABELS = ("MYTH", "FACT")
+DISCUSSION_SEPARATOR = "|"
+# Ids are stored as unsigned 32-bit integers in compiled packs and review
+# schedules.
+MAX_CARD_ID = 0xFFFFFFFF
+# Tags are "facet:value" strings, e.g. "region:india" or "difficulty:easy".
+TAG_FACETS = ("region", "topic", "difficulty", "age")
+TAG_VALUE = re.compile(r"[a-z0-9+-]+")
+
+
+class PackError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Card:
+    id: int
+    statement: str
+    label: str
+    explanation: str
+    discussion: Tuple[str, ...]
+    tags: Tuple[str, ...] = ()
+
+
+def card_from_dict(row: Dict[str, object]) -> Card:
+    discussion = row.get("discussion") or ()
+    if isinstance(discussion, str):
+        discussion = discussion.split(DISCUSSION_SEPARATOR)
+    tags = row.get("tags") or ()
+    if isinstance(tags, str):
+        tags = tags.split(DISCUSSION_SEPARATOR)
+    return Card(
+        id=int(row["id"]),
+        statement=str(row["statement"]).strip(),
+        label=str(row["label"]).strip().upper(),
+        explanation=str(row["explanation"]).strip(),
+        discussion=tuple(str(item).strip() for item in discussion if str(item).strip()),
+        tags=tuple(dict.fromkeys(str(tag).strip().lower() for tag in tags if str(tag).strip())),
+    )
+
+
+def validate_card(card: Card) -> None:
+    if not 0 <= card.id <= MAX_CARD_ID:
+        raise PackError(f"card id must be between 0 and {MAX_CARD_ID}, got {card.id}")
+    if card.label not in LABELS:
+        raise PackError(f"card {card.id}: label must be one of {', '.join(LABELS)}, got {card.label!r}")
+    if not card.statement:
+        raise PackError(f"card {card.id}: statement is empty")
+    if not card.explanation:
+        raise PackError(f"card {card.id}: explanation is empty")
+    if not card.discussion:
+        raise PackError(f"card {card.id}: at least one discussion prompt is required")
+    for tag in card.tags:
+        facet, _, value = tag.partition(":")
+        if facet not in TAG_FACETS or not TAG_VALUE.fullmatch(value):
+            raise PackError(
+                f"card {card.id}: tags must look like <facet>:<value> with facet one of "
+                f"{', '.join(TAG_FACETS)}, got {tag!r}"
+            )
+
+
+def read_rows(path: str) -> Iterator[Dict[str, object]]:
+    # JSONL packs hold one card object per line; CSV packs use the same column
+    # names with discussion prompts and tags separated by DISCUSSION_SEPARATOR.
+    # utf-8-sig drops the byte order mark that spreadsheet exports often add.
+    with open(path, encoding="utf-8-sig", newline="") as handle:
+        if path.endswith(".csv"):
+            yield from csv.DictReader(handle)
+            return
+        for line in handle:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_cards(path: str) -> Iterator[Card]:
+    for row_no, row in enumerate(read_rows(path), 1):
+        try:
+            card = card_from_dict(row)
+            validate_card(card)
+        except (KeyError, TypeError, ValueError) as exc:
+            raise PackError(f"{path} row {row_no}: {exc}") from exc
+        yield card
+
+
+@lru_cache(maxsize=None)
+def load_cards(path: str = str(DEFAULT_PACK)) -> Sequence[Card]:
+    # Parsed once per process; Streamlit reruns only re-execute the page script.
+    # Compiled packs are memory-mapped and decode cards only when they are dealt.
+    if path.endswith(".mfpack"):
+        from cardpack import CardPack
+
+        return CardPack(path)
+    return tuple(read_cards(path))
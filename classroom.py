@@ -0,0 +1,263 @@
+import itertools
+import secrets
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from backends import Backend
+from cards import LABELS
+from dealer import RoundKey, RoundSpec, new_round_key
+
+CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+CODE_LENGTH = 6
+COUNTER_SHARDS = 16
+IDLE_SECONDS = 6 * 60 * 60
+
+_shard_ids = itertools.count()
+_thread_shard = threading.local()
+
+
+def _shard_index() -> int:
+    # Each Streamlit session runs its script on its own thread, so giving every
+    # thread a fixed shard spreads simultaneous clicks over separate locks.
+    shard = getattr(_thread_shard, "index", None)
+    if shard is None:
+        shard = _thread_shard.index = next(_shard_ids)
+    return shard
+
+
+class ShardedCounter:
+    __slots__ = ("_shards",)
+
+    def __init__(self, slots: int, shards: int = COUNTER_SHARDS) -> None:
+        self._shards = [(threading.Lock(), [0] * slots) for _ in range(shards)]
+
+    def add(self, slot: int, amount: int = 1) -> None:
+        lock, counts = self._shards[_shard_index() % len(self._shards)]
+        with lock:
+            counts[slot] += amount
+
+    def totals(self) -> List[int]:
+        totals = [0] * len(self._shards[0][1])
+        for lock, counts in self._shards:
+            with lock:
+                for slot, count in enumerate(counts):
+                    totals[slot] += count
+        return totals
+
+
+class Classroom:
+    # One shared round per class, held once per process. Students read the
+    # current index and version directly; answers go to per-card sharded
+    # tallies so a whole class clicking at once does not queue on one lock.
+    __slots__ = (
+        "code",
+        "round",
+        "query",
+        "spec",
+        "deck",
+        "size",
+        "index",
+        "revealed",
+        "version",
+        "tallies",
+        "students",
+        "touched_at",
+    )
+
+    def __init__(
+        self,
+        code: str,
+        round_key: RoundKey,
+        size: int,
+        query: str = "",
+        spec: Optional[RoundSpec] = None,
+        deck: Tuple[int, ...] = (),
+    ) -> None:
+        self.code = code
+        self.round = round_key
+        self.query = query
+        self.spec = spec
+        # Card ids, fixed when the class starts so a pack reload cannot
+        # change the round under the students.
+        self.deck = deck
+        self.size = size
+        self.index = 0
+        self.revealed = False
+        self.version = 0
+        self.tallies = [ShardedCounter(len(LABELS)) for _ in range(size)]
+        self.students = ShardedCounter(1)
+        self.touched_at = time.monotonic()
+
+    @property
+    def finished(self) -> bool:
+        return self.index >= self.size
+
+    def join(self) -> None:
+        self.students.add(0)
+
+    def student_count(self) -> int:
+        return self.students.totals()[0]
+
+    def answer(self, index: int, guess: str) -> bool:
+        if index != self.index or self.finished:
+            return False
+        self.tallies[index].add(LABELS.index(guess))
+        return True
+
+    def tally(self, index: Optional[int] = None) -> Dict[str, int]:
+        index = self.index if index is None else index
+        return dict(zip(LABELS, self.tallies[index].totals()))
+
+    def reveal(self) -> None:
+        self.revealed = True
+        self._touch()
+
+    def advance(self) -> None:
+        if not self.finished:
+            self.index += 1
+            self.revealed = False
+            self._touch()
+
+    def _touch(self) -> None:
+        self.touched_at = time.monotonic()
+        self.version += 1
+
+
+class ClassroomRegistry:
+    def __init__(self) -> None:
+        self._rooms: Dict[str, Classroom] = {}
+        self._lock = threading.Lock()
+
+    def create(
+        self,
+        size: int,
+        round_key: Optional[RoundKey] = None,
+        query: str = "",
+        spec: Optional[RoundSpec] = None,
+        deck: Tuple[int, ...] = (),
+    ) -> Classroom:
+        with self._lock:
+            self._prune()
+            code = self._new_code()
+            room = self._rooms[code] = Classroom(code, round_key or new_round_key(), size, query, spec, deck)
+        return room
+
+    def get(self, code: str) -> Optional[Classroom]:
+        return self._rooms.get(code.strip().upper())
+
+    def close(self, code: str) -> None:
+        with self._lock:
+            self._rooms.pop(code, None)
+
+    def _new_code(self) -> str:
+        while True:
+            code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+            if code not in self._rooms:
+                return code
+
+    def _prune(self) -> None:
+        cutoff = time.monotonic() - IDLE_SECONDS
+        for code in [code for code, room in self._rooms.items() if room.touched_at < cutoff]:
+            del self._rooms[code]
+
+
+CLASSROOMS = ClassroomRegistry()
+
+
+class SharedClassroom:
+    # A classroom read from a shared backend: a snapshot of the class hash taken
+    # once per poll. Tallies are backend hash increments, which Redis and SQLite
+    # apply atomically without any lock in the app process.
+    def __init__(self, backend: Backend, code: str, fields: Dict[str, str]) -> None:
+        self.backend = backend
+        self.code = code
+        self.round = RoundKey.from_code(fields["round"])
+        self.query = fields.get("query", "")
+        self.spec = RoundSpec.from_text(fields["spec"]) if fields.get("spec") else None
+        self.deck = tuple(int(item) for item in fields.get("deck", "").split(",") if item)
+        self.size = int(fields["size"])
+        self.index = int(fields.get("index", 0))
+        self.revealed = fields.get("revealed") == "1"
+        self.version = int(fields.get("version", 0))
+        self.students = int(fields.get("students", 0))
+
+    @property
+    def key(self) -> str:
+        return f"class:{self.code}"
+
+    @property
+    def finished(self) -> bool:
+        return self.index >= self.size
+
+    def join(self) -> None:
+        self.backend.hincrby(self.key, "students")
+
+    def student_count(self) -> int:
+        return self.students
+
+    def answer(self, index: int, guess: str) -> bool:
+        if index != self.index or self.finished:
+            return False
+        self.backend.hincrby(f"{self.key}:tally", f"{index}:{guess}")
+        return True
+
+    def tally(self, index: Optional[int] = None) -> Dict[str, int]:
+        index = self.index if index is None else index
+        counts = self.backend.hgetall(f"{self.key}:tally")
+        return {label: int(counts.get(f"{index}:{label}", 0)) for label in LABELS}
+
+    def reveal(self) -> None:
+        self._update(revealed="1")
+
+    def advance(self) -> None:
+        if not self.finished:
+            self._update(index=str(self.index + 1), revealed="0")
+
+    def _update(self, **fields: str) -> None:
+        version = str(self.version + 1)
+        self.backend.hset(self.key, {**fields, "version": version}, ttl=IDLE_SECONDS)
+        self.backend.hset(f"{self.key}:tally", {"version": version}, ttl=IDLE_SECONDS)
+
+
+class BackendClassroomRegistry:
+    def __init__(self, backend: Backend) -> None:
+        self.backend = backend
+
+    def create(
+        self,
+        size: int,
+        round_key: Optional[RoundKey] = None,
+        query: str = "",
+        spec: Optional[RoundSpec] = None,
+        deck: Tuple[int, ...] = (),
+    ) -> SharedClassroom:
+        while True:
+            code = "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+            if not self.backend.hgetall(f"class:{code}"):
+                break
+        fields = {
+            "round": (round_key or new_round_key()).code,
+            "query": query,
+            "spec": spec.text if spec else "",
+            "deck": ",".join(map(str, deck)),
+            "size": str(size),
+            "index": "0",
+            "revealed": "0",
+        }
+        self.backend.hset(f"class:{code}", fields, ttl=IDLE_SECONDS)
+        self.backend.hset(f"class:{code}:tally", {"version": "0"}, ttl=IDLE_SECONDS)
+        return SharedClassroom(self.backend, code, fields)
+
+    def get(self, code: str) -> Optional[SharedClassroom]:
+        code = code.strip().upper()
+        fields = self.backend.hgetall(f"class:{code}")
+        return SharedClassroom(self.backend, code, fields) if fields else None
+
+    def close(self, code: str) -> None:
+        self.backend.delete(f"class:{code}")
+        self.backend.delete(f"class:{code}:tally")
+
+
+def open_classrooms(backend: Backend) -> Union[ClassroomRegistry, BackendClassroomRegistry]:
+    return BackendClassroomRegistry(backend) if backend.shared else CLASSROOMS
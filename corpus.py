@@ -0,0 +1,191 @@
+"""The live card corpus, reloaded when its pack changes.
+
+A Corpus is an immutable snapshot: the cards, their tag/label index, the search
+index and a map from card id to position. A watcher thread polls the pack file
+and, when it changes, builds the next snapshot and swaps it in with a single
+reference assignment, so a rerun that already holds a snapshot keeps using it
+and the next rerun picks up the new one. No session is dropped.
+
+When the cards that were already there keep their order (typo fixes, edited
+explanations or tags, new cards appended at the end), only the changed cards
+are rebuilt: unchanged Card objects are reused and the indexes are updated for
+the changed positions alone. Anything else (removed or reordered cards, or a
+compiled .mfpack) rebuilds the indexes from scratch. Cards removed from the
+pack stay reachable by id, so a round dealt before the reload can finish.
+"""
+
+import os
+import sys
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from cards import DEFAULT_PACK, Card, PackError, read_cards
+from dealer import CardChange, CardIndex, build_index, update_index
+from search import SearchIndex
+
+RELOAD_SECONDS = float(os.environ.get("MYTH_OR_FACT_RELOAD_SECONDS", "2"))
+
+# What identifies one saved version of the pack file.
+Stamp = Tuple[int, int, int]
+
+
+def file_stamp(path: str) -> Stamp:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class Corpus:
+    __slots__ = ("version", "path", "stamp", "cards", "index", "search", "positions", "retired", "facets", "changed")
+
+    def __init__(
+        self,
+        version: int,
+        path: str,
+        stamp: Stamp,
+        cards: Sequence[Card],
+        index: CardIndex,
+        search: SearchIndex,
+        positions: Dict[int, int],
+        retired: Dict[int, Card],
+        changed: int,
+    ) -> None:
+        self.version = version
+        self.path = path
+        self.stamp = stamp
+        self.cards = cards
+        self.index = index
+        self.search = search
+        self.positions = positions
+        # Cards removed by earlier reloads, by id.
+        self.retired = retired
+        # Cards rebuilt by the reload that produced this version (all of them
+        # for a full build).
+        self.changed = changed
+        self.facets = index.facets()
+
+
+def card_positions(cards: Sequence[Card]) -> Dict[int, int]:
+    id_of = getattr(cards, "id_at", None) or (lambda position: cards[position].id)
+    positions: Dict[int, int] = {}
+    for position in range(len(cards)):
+        card_id = id_of(position)
+        if card_id in positions:
+            raise PackError(f"duplicate card id {card_id}")
+        positions[card_id] = position
+    return positions
+
+
+def _load(path: str) -> Sequence[Card]:
+    # Not cards.load_cards: that is cached for the life of the process.
+    if path.endswith(".mfpack"):
+        from cardpack import CardPack
+
+        return CardPack(path)
+    return tuple(read_cards(path))
+
+
+def build_corpus(path: str, previous: Optional[Corpus] = None) -> Corpus:
+    stamp = file_stamp(path)
+    cards = _load(path)
+    positions = card_positions(cards)
+    version = previous.version + 1 if previous else 1
+    retired: Dict[int, Card] = {}
+    if previous is not None:
+        retired = {card_id: card for card_id, card in previous.retired.items() if card_id not in positions}
+        for card_id, position in previous.positions.items():
+            if card_id not in positions:
+                retired[card_id] = previous.cards[position]
+
+    old = previous.cards if previous is not None and isinstance(previous.cards, tuple) else None
+    if old is not None and isinstance(cards, tuple) and len(cards) >= len(old):
+        if all(cards[position].id == old[position].id for position in range(len(old))):
+            return _update_corpus(previous, stamp, cards, positions, retired)
+    return Corpus(
+        version, path, stamp, cards, build_index(cards), SearchIndex(cards), positions, retired, changed=len(cards)
+    )
+
+
+def _update_corpus(
+    previous: Corpus,
+    stamp: Stamp,
+    cards: Tuple[Card, ...],
+    positions: Dict[int, int],
+    retired: Dict[int, Card],
+) -> Corpus:
+    old = previous.cards
+    kept: List[Card] = []
+    changes: List[CardChange] = []
+    for position, card in enumerate(cards):
+        before = old[position] if position < len(old) else None
+        if card == before:
+            kept.append(before)
+        else:
+            kept.append(card)
+            changes.append((position, before, card))
+    cards = tuple(kept)
+    if not changes:
+        index, search = previous.index, previous.search
+    else:
+        index = update_index(previous.index, len(cards), changes)
+        search = previous.search.updated(cards, changes)
+    return Corpus(
+        previous.version + 1, previous.path, stamp, cards, index, search, positions, retired, changed=len(changes)
+    )
+
+
+class LiveCorpus:
+    # Holds the current snapshot. Readers take `current` once per rerun; the
+    # watcher replaces it whole, never mutates it.
+    def __init__(self, path: str, interval: float = RELOAD_SECONDS) -> None:
+        self.path = path
+        self.interval = interval
+        self.current = build_corpus(path)
+        self.error = ""
+        self.reloaded_at = time.time()
+        self._failed: Optional[Stamp] = None
+        self._lock = threading.Lock()
+        if interval > 0:
+            self._watcher = threading.Thread(target=self._watch_loop, name="corpus-watcher", daemon=True)
+            self._watcher.start()
+
+    def reload(self) -> bool:
+        # Returns True when a new version was swapped in. A pack that fails to
+        # parse (often one caught half-saved) leaves the current version in
+        # place until the file changes again.
+        with self._lock:
+            current = self.current
+            stamp = None
+            try:
+                stamp = file_stamp(self.path)
+                if stamp in (current.stamp, self._failed):
+                    return False
+                corpus = build_corpus(self.path, current)
+            except (OSError, ValueError) as exc:
+                # ValueError covers PackError and malformed JSON or text.
+                if str(exc) != self.error:
+                    print(f"card pack reload failed, keeping version {current.version}: {exc}", file=sys.stderr)
+                self.error = str(exc)
+                self._failed = stamp
+                return False
+            self.error = ""
+            self.reloaded_at = time.time()
+            self.current = corpus
+            return True
+
+    def _watch_loop(self) -> None:
+        # Nothing may end this thread: hot reload would stop silently for the
+        # life of the process.
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.reload()
+            except Exception as exc:
+                self.error = f"{type(exc).__name__}: {exc}"
+                print(f"card pack reload failed, keeping version {self.current.version}: {exc!r}", file=sys.stderr)
+
+
+@lru_cache(maxsize=None)
+def open_corpus(path: str = str(DEFAULT_PACK)) -> LiveCorpus:
+    return LiveCorpus(path)
@@ -0,0 +1,381 @@
+import base64
+import binascii
+import random
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import repeat
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from cards import DEFAULT_PACK, LABELS, TAG_FACETS, Card, load_cards
+
+# Set-bit offsets of every byte value, for turning bitsets back into positions.
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+def bits_from_positions(positions: Iterable[int]) -> int:
+    data = bytearray()
+    for position in positions:
+        byte = position >> 3
+        if byte >= len(data):
+            data.extend(bytes(byte + 1 - len(data)))
+        data[byte] |= 1 << (position & 7)
+    return int.from_bytes(data, "little")
+
+
+def positions_from_bits(bits: int) -> array:
+    # Ascending positions of the set bits, one byte at a time rather than one
+    # big-integer shift per bit.
+    positions = array("I")
+    for byte, value in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, "little")):
+        if value:
+            base = byte << 3
+            positions.extend(base + bit for bit in _BYTE_BITS[value])
+    return positions
+
+
+@dataclass(frozen=True)
+class CardIndex:
+    total: int
+    by_label: Dict[str, array]
+    # Bitsets over card positions: bit n is set when card n has the label or
+    # carries the tag. Composing a round is a few ANDs and ORs of these.
+    label_bits: Dict[str, int] = field(default_factory=dict)
+    tag_bits: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def all_bits(self) -> int:
+        bits = 0
+        for label_bits in self.label_bits.values():
+            bits |= label_bits
+        return bits
+
+    def positions(self, label: str) -> array:
+        return self.by_label.get(label, array("I"))
+
+    def label_of(self, position: int) -> str:
+        # Position arrays are built in ascending order, so membership is a
+        # binary search rather than a scan.
+        for label, positions in self.by_label.items():
+            found = bisect_left(positions, position)
+            if found < len(positions) and positions[found] == position:
+                return label
+        raise IndexError(f"card position {position} is not indexed")
+
+    def facets(self) -> Dict[str, Dict[str, int]]:
+        # Card count per tag value, grouped by facet, for filter menus.
+        counts: Dict[str, Dict[str, int]] = {facet: {} for facet in TAG_FACETS}
+        for tag, bits in sorted(self.tag_bits.items()):
+            facet, _, value = tag.partition(":")
+            counts.setdefault(facet, {})[value] = bits.bit_count()
+        return counts
+
+    def select(self, tags: Iterable[str]) -> int:
+        # Cards carrying any of the chosen values in every facet that has a
+        # choice: "region:india" AND ("difficulty:easy" OR "difficulty:medium").
+        by_facet: Dict[str, int] = {}
+        for tag in tags:
+            facet = tag.partition(":")[0]
+            by_facet[facet] = by_facet.get(facet, 0) | self.tag_bits.get(tag, 0)
+        bits = self.all_bits
+        for facet_bits in by_facet.values():
+            bits &= facet_bits
+        return bits
+
+    def restrict(self, bits: int) -> "CardIndex":
+        # The same index over only the cards in bits (a custom or filtered
+        # round), so the dealer draws from it exactly as from the whole corpus.
+        label_bits = {label: label_bits & bits for label, label_bits in self.label_bits.items()}
+        return CardIndex(
+            total=sum(value.bit_count() for value in label_bits.values()),
+            by_label={label: positions_from_bits(value) for label, value in label_bits.items()},
+            label_bits=label_bits,
+            tag_bits={tag: tag_bits & bits for tag, tag_bits in self.tag_bits.items() if tag_bits & bits},
+        )
+
+
+def build_index(cards: Sequence[Card]) -> CardIndex:
+    label_of = getattr(cards, "label_at", None) or (lambda position: cards[position].label)
+    tags_of = getattr(cards, "tags_at", None) or (lambda position: cards[position].tags)
+    by_label = {label: array("I") for label in LABELS}
+    by_tag: Dict[str, array] = {}
+    for position in range(len(cards)):
+        by_label[label_of(position)].append(position)
+        for tag in tags_of(position):
+            by_tag.setdefault(tag, array("I")).append(position)
+    return CardIndex(
+        total=len(cards),
+        by_label=by_label,
+        label_bits={label: bits_from_positions(positions) for label, positions in by_label.items()},
+        tag_bits={tag: bits_from_positions(positions) for tag, positions in by_tag.items()},
+    )
+
+
+# An edited or appended card: (position, card before the edit or None, card
+# after the edit).
+CardChange = Tuple[int, Optional[Card], Card]
+
+
+def _changed_keys(changes: Sequence[CardChange], keys_of) -> Tuple[Dict[str, List[int]], Dict[str, List[int]]]:
+    removed: Dict[str, List[int]] = {}
+    added: Dict[str, List[int]] = {}
+    for position, before, after in changes:
+        old = set(keys_of(before)) if before is not None else set()
+        new = set(keys_of(after))
+        for key in old - new:
+            removed.setdefault(key, []).append(position)
+        for key in new - old:
+            added.setdefault(key, []).append(position)
+    return removed, added
+
+
+def update_index(index: CardIndex, total: int, changes: Sequence[CardChange]) -> CardIndex:
+    # The index after editing and appending cards, without rescanning the
+    # corpus: each label or tag that gained or lost cards is updated with one
+    # mask of the positions concerned. Positions of unchanged cards must stay
+    # where they were.
+    label_bits = dict(index.label_bits)
+    tag_bits = dict(index.tag_bits)
+    touched = set()
+    for bits, keys_of in ((label_bits, lambda card: (card.label,)), (tag_bits, lambda card: card.tags)):
+        removed, added = _changed_keys(changes, keys_of)
+        for key, positions in removed.items():
+            bits[key] = bits.get(key, 0) & ~bits_from_positions(positions)
+        for key, positions in added.items():
+            bits[key] = bits.get(key, 0) | bits_from_positions(positions)
+        touched.update(removed, added)
+    return CardIndex(
+        total=total,
+        by_label={
+            label: positions_from_bits(bits) if label in touched else index.positions(label)
+            for label, bits in label_bits.items()
+        },
+        label_bits=label_bits,
+        tag_bits={tag: bits for tag, bits in tag_bits.items() if bits},
+    )
+
+
+@lru_cache(maxsize=None)
+def load_index(path: str = str(DEFAULT_PACK)) -> CardIndex:
+    return build_index(load_cards(path))
+
+
+def _mix(value: int) -> int:
+    value = ((value ^ (value >> 16)) * 0x45D9F3B) & 0xFFFFFFFF
+    value = ((value ^ (value >> 16)) * 0x45D9F3B) & 0xFFFFFFFF
+    return value ^ (value >> 16)
+
+
+def permute(position: int, size: int, seed: int) -> int:
+    # Four-round Feistel network over the smallest even-bit domain covering
+    # size, cycle-walking back into range. A bijection on [0, size) that is
+    # computed on demand, so a shuffled order never has to be materialised.
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+    mask = (1 << half_bits) - 1
+    keys = [_mix(seed + round_no) for round_no in range(4)]
+    value = position
+    while True:
+        left, right = value >> half_bits, value & mask
+        for key in keys:
+            left, right = right, left ^ (_mix(right ^ key) & mask)
+        value = (left << half_bits) | right
+        if value < size:
+            return value
+
+
+class ShuffleCursor:
+    # A learner's walk through one label's cards: the seed picks a permutation
+    # per pass and the position counts cards drawn so far. Once a pass covers
+    # every card, the next pass uses a fresh permutation derived from the seed.
+    __slots__ = ("seed", "position")
+
+    def __init__(self, seed: int, position: int = 0) -> None:
+        self.seed = seed
+        self.position = position
+
+    def __repr__(self) -> str:
+        return f"ShuffleCursor(seed={self.seed}, position={self.position})"
+
+    def draw(self, population: Sequence[int], count: int, exclude: Set[int]) -> List[int]:
+        size = len(population)
+        drawn: List[int] = []
+        # At most one full pass of skips, so a round that already holds the
+        # whole population cannot loop forever.
+        for _ in range(count + size if size else 0):
+            if len(drawn) >= count:
+                break
+            epoch, offset = divmod(self.position, size)
+            position = population[permute(offset, size, _mix(self.seed + epoch))]
+            self.position += 1
+            if position not in exclude:
+                exclude.add(position)
+                drawn.append(position)
+        return drawn
+
+
+@dataclass(frozen=True)
+class RoundKey:
+    # Everything needed to rebuild a round: the learner seed and how far each
+    # label's walk had got. Shared as a short round code.
+    seed: int
+    fact_position: int = 0
+    myth_position: int = 0
+
+    def cursors(self) -> Dict[str, ShuffleCursor]:
+        return {
+            "FACT": ShuffleCursor(_mix(self.seed ^ 0xFAC7), self.fact_position),
+            "MYTH": ShuffleCursor(_mix(self.seed ^ 0x3717), self.myth_position),
+        }
+
+    @property
+    def code(self) -> str:
+        data = bytearray(self.seed.to_bytes(4, "big"))
+        for value in (self.fact_position, self.myth_position):
+            while value >= 0x80:
+                data.append(value & 0x7F | 0x80)
+                value >>= 7
+            data.append(value)
+        return base64.b32encode(bytes(data)).decode("ascii").rstrip("=")
+
+    @classmethod
+    def from_code(cls, code: str) -> "RoundKey":
+        text = code.strip().upper().replace("-", "").replace(" ", "")
+        try:
+            data = base64.b32decode(text + "=" * (-len(text) % 8))
+        except (ValueError, binascii.Error) as exc:
+            raise ValueError(f"invalid round code {code!r}") from exc
+        if len(data) < 6:
+            raise ValueError(f"invalid round code {code!r}")
+        values = []
+        value = shift = 0
+        for byte in data[4:]:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                values.append(value)
+                value = shift = 0
+        if len(values) != 2 or shift:
+            raise ValueError(f"invalid round code {code!r}")
+        return cls(int.from_bytes(data[:4], "big"), *values)
+
+
+@dataclass(frozen=True)
+class RoundSpec:
+    # What a round is dealt from: how many cards of each label and the tags
+    # they must carry. Written as text such as "5+10 region:india".
+    facts: int
+    myths: int
+    tags: Tuple[str, ...] = ()
+
+    @property
+    def size(self) -> int:
+        return self.facts + self.myths
+
+    @property
+    def text(self) -> str:
+        return " ".join((f"{self.facts}+{self.myths}",) + self.tags)
+
+    @classmethod
+    def from_text(cls, text: str) -> "RoundSpec":
+        counts, *tags = text.split()
+        facts, plus, myths = counts.partition("+")
+        if not plus or not facts.isdigit() or not myths.isdigit():
+            raise ValueError(f"invalid round spec {text!r}")
+        return cls(int(facts), int(myths), tuple(tags))
+
+
+# Joins a round code to a round spec in a share code, such as
+# "HTVT77IAAA~3+3~region:india". A bare round code deals the default mix.
+SHARE_SEPARATOR = "~"
+
+
+def share_code(key: RoundKey, spec: Optional[RoundSpec] = None) -> str:
+    if spec is None:
+        return key.code
+    return SHARE_SEPARATOR.join((key.code,) + tuple(spec.text.split()))
+
+
+def parse_share_code(text: str) -> Tuple[RoundKey, Optional[RoundSpec]]:
+    code, *spec = text.strip().split(SHARE_SEPARATOR)
+    return RoundKey.from_code(code), RoundSpec.from_text(" ".join(spec)) if spec else None
+
+
+def new_round_key(rng: Optional[random.Random] = None) -> RoundKey:
+    return RoundKey((rng or random).getrandbits(32))
+
+
+def deal_round(
+    index: CardIndex,
+    key: RoundKey,
+    facts: int,
+    myths: int,
+    round_size: int,
+    reviews: Sequence[int] = (),
+) -> Tuple[List[int], RoundKey]:
+    # Each label is drawn from the key's cursor, so consecutive rounds do not
+    # repeat a card until that label is exhausted. Cost is proportional to the
+    # round size, never to the corpus size. The same key always deals the same
+    # deck; the returned key continues the walk for the next round. Review
+    # cards take the place of fresh cards of the same label, up to that
+    # label's count, so reviews never change the round's mix.
+    cursors = key.cursors()
+    quota = {"FACT": facts, "MYTH": myths}
+    deck: List[int] = []
+    for position in dict.fromkeys(reviews):
+        label = index.label_of(position)
+        if quota[label] > 0:
+            quota[label] -= 1
+            deck.append(position)
+    chosen: Set[int] = set(deck)
+    deck += cursors["FACT"].draw(index.positions("FACT"), quota["FACT"], chosen)
+    deck += cursors["MYTH"].draw(index.positions("MYTH"), quota["MYTH"], chosen)
+
+    target_size = min(round_size, index.total)
+    for label in LABELS:
+        if len(deck) >= target_size:
+            break
+        deck += cursors[label].draw(index.positions(label), target_size - len(deck), chosen)
+
+    random.Random(_mix(key.seed ^ key.fact_position) ^ key.myth_position).shuffle(deck)
+    return deck, RoundKey(key.seed, cursors["FACT"].position, cursors["MYTH"].position)
+
+
+def class_round_keys(seed: int, count: int) -> List[RoundKey]:
+    rng = random.Random(seed)
+    return [new_round_key(rng) for _ in range(count)]
+
+
+def _deal_chunk(path: str, keys: List[RoundKey], facts: int, myths: int, round_size: int) -> List[List[int]]:
+    index = load_index(path)
+    return [deal_round(index, key, facts, myths, round_size)[0] for key in keys]
+
+
+def deal_many(
+    keys: Sequence[RoundKey],
+    facts: int,
+    myths: int,
+    round_size: int,
+    path: str = str(DEFAULT_PACK),
+    workers: Optional[int] = None,
+    chunk_size: int = 5000,
+) -> List[List[int]]:
+    # Small batches are dealt inline; large ones are split across a process
+    # pool where each worker loads the (cached) index once.
+    keys = list(keys)
+    if len(keys) <= chunk_size or workers == 1:
+        return _deal_chunk(path, keys, facts, myths, round_size)
+    chunks = [keys[start:start + chunk_size] for start in range(0, len(keys), chunk_size)]
+    decks: List[List[int]] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_decks in pool.map(
+            _deal_chunk,
+            repeat(path),
+            chunks,
+            repeat(facts),
+            repeat(myths),
+            repeat(round_size),
+        ):
+            decks.extend(chunk_decks)
+    return decks
@@ -0,0 +1,248 @@
+"""Near-duplicate statement detection.
+
+Statements are normalised (search.tokenize: case and accents folded,
+punctuation dropped) and cut into overlapping 4-byte shingles. Each card gets
+a MinHash signature and the signatures are split into bands for
+locality-sensitive hashing: cards that agree on every value of some band share
+a bucket and become candidates, and only candidates have their shingle sets
+compared. The work grows with the corpus and the number of near-duplicates,
+not with the number of card pairs.
+
+A card whose shingle Jaccard similarity to an earlier card reaches the
+threshold joins that card's cluster. Collapsing a cluster keeps its first card
+in source order and drops the others with the same label. A card labelled
+differently from the first ("X is Y" next to "X is not Y") is a conflict: it
+is reported but never dropped.
+
+Usage:
+
+    python dedup.py packs/core.jsonl contrib.csv --report duplicates.csv
+"""
+
+import argparse
+import csv
+import sys
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from cardpack import iter_sources
+from cards import Card, PackError
+from search import tokenize
+
+SHINGLE_BYTES = 4
+BANDS = 32
+ROWS = 4
+THRESHOLD = 0.5
+# Signatures are computed this many cards at a time to bound peak memory.
+CHUNK_CARDS = 20000
+SEED = 0x5EED
+# With 128 values the estimate's standard error is at most about 0.045.
+ESTIMATE_MARGIN = 0.15
+
+
+@dataclass(frozen=True)
+class DuplicateCluster:
+    # Card positions in source order; the first is the one kept on collapse.
+    positions: Tuple[int, ...]
+    # Jaccard similarity of each card to the first (1.0 for the first).
+    similarity: Tuple[float, ...]
+    # Positions of the cards labelled differently from the first; they are
+    # kept on collapse.
+    conflicts: Tuple[int, ...] = ()
+
+    @property
+    def conflict(self) -> bool:
+        return bool(self.conflicts)
+
+    @property
+    def dropped(self) -> Tuple[int, ...]:
+        return tuple(position for position in self.positions[1:] if position not in self.conflicts)
+
+
+def normalized_bytes(statement: str) -> bytes:
+    # Padded so even a one-word statement has a shingle.
+    return " ".join(tokenize(statement)).encode("utf-8").ljust(SHINGLE_BYTES)
+
+
+def shingle_set(statement: str) -> Set[bytes]:
+    data = normalized_bytes(statement)
+    return {data[start:start + SHINGLE_BYTES] for start in range(len(data) - SHINGLE_BYTES + 1)}
+
+
+def jaccard(first: Set[bytes], second: Set[bytes]) -> float:
+    return len(first & second) / len(first | second)
+
+
+def _shingles(statements: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    # Every shingle of every statement packed into one integer, plus where
+    # each card's shingles start. One pass of array arithmetic per shingle
+    # byte instead of a Python loop per shingle.
+    encoded = [normalized_bytes(statement) for statement in statements]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+    counts = lengths - SHINGLE_BYTES + 1
+    card_starts = np.cumsum(lengths) - lengths
+    offsets = np.cumsum(counts) - counts
+    starts = np.repeat(card_starts - offsets, counts) + np.arange(counts.sum())
+    values = np.zeros(len(starts), dtype=np.uint64)
+    for byte in range(SHINGLE_BYTES):
+        values |= data[starts + byte] << np.uint64(8 * byte)
+    return values, offsets
+
+
+def minhash_signatures(statements: Sequence[str], num_perm: int = BANDS * ROWS, seed: int = SEED) -> np.ndarray:
+    # One row per statement. Permutations are multiply-shift hashes,
+    # (a * x + b) mod 2**64 >> 32 with odd a, which numpy evaluates with
+    # wrapping uint64 arithmetic.
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(0, 2**64 - 1, size=num_perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+    increments = rng.integers(0, 2**64 - 1, size=num_perm, dtype=np.uint64, endpoint=True)
+    signatures = np.empty((len(statements), num_perm), dtype=np.uint32)
+    shift = np.uint64(32)
+    for start in range(0, len(statements), CHUNK_CARDS):
+        values, offsets = _shingles(statements[start:start + CHUNK_CARDS])
+        rows = signatures[start:start + len(offsets)]
+        for perm in range(num_perm):
+            hashed = (values * multipliers[perm] + increments[perm]) >> shift
+            rows[:, perm] = np.minimum.reduceat(hashed, offsets)
+    return signatures
+
+
+def candidate_pairs(signatures: np.ndarray, bands: int = BANDS) -> Tuple[np.ndarray, np.ndarray]:
+    # Each bucket pairs its first card with every other member rather than
+    # listing all pairs, so a bucket of n identical statements costs n - 1
+    # comparisons. Near-duplicates that miss each other here still meet in
+    # another band or through the first card. Returns (first, second) arrays.
+    count, num_perm = signatures.shape
+    rows = num_perm // bands
+    codes = []
+    for band in range(bands):
+        keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows]).view(f"V{rows * 4}").ravel()
+        order = np.argsort(keys, kind="stable")
+        ordered = keys[order]
+        starts = np.ones(count, dtype=bool)
+        starts[1:] = ordered[1:] != ordered[:-1]
+        # Position, in sorted order, of the first member of each card's bucket.
+        first = np.maximum.accumulate(np.where(starts, np.arange(count), 0))
+        members = ~starts
+        codes.append(order[first[members]].astype(np.int64) * count + order[members])
+    pairs = np.unique(np.concatenate(codes)) if codes else np.empty(0, dtype=np.int64)
+    return pairs // count, pairs % count
+
+
+def estimated_similarity(signatures: np.ndarray, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    # The fraction of MinHash values two signatures share estimates their
+    # Jaccard similarity; computed a chunk of pairs at a time.
+    estimates = np.empty(len(first), dtype=np.float32)
+    for start in range(0, len(first), CHUNK_CARDS):
+        stop = start + CHUNK_CARDS
+        estimates[start:stop] = (signatures[first[start:stop]] == signatures[second[start:stop]]).mean(axis=1)
+    return estimates
+
+
+def find_duplicates(
+    statements: Sequence[str],
+    labels: Optional[Sequence[str]] = None,
+    threshold: float = THRESHOLD,
+    bands: int = BANDS,
+    rows: int = ROWS,
+) -> List[DuplicateCluster]:
+    signatures = minhash_signatures(statements, bands * rows)
+    first, second = candidate_pairs(signatures, bands)
+    # Candidates whose estimate is well below the threshold are dropped
+    # without building their shingle sets; the rest are checked exactly.
+    likely = estimated_similarity(signatures, first, second) >= threshold - ESTIMATE_MARGIN
+    shingles: Dict[int, Set[bytes]] = {}
+
+    def shingles_of(position: int) -> Set[bytes]:
+        found = shingles.get(position)
+        if found is None:
+            found = shingles[position] = shingle_set(statements[position])
+        return found
+
+    # Earlier cards each card was confirmed similar to. Bucket members are
+    # in ascending position, so the first card of a pair is the earlier one.
+    earlier: Dict[int, List[Tuple[int, float]]] = {}
+    for one, other in zip(first[likely].tolist(), second[likely].tolist()):
+        similarity = jaccard(shingles_of(one), shingles_of(other))
+        if similarity >= threshold:
+            earlier.setdefault(other, []).append((one, similarity))
+
+    # Leader clustering rather than connected components: a card joins the
+    # earliest similar card that is not itself a duplicate, so every dropped
+    # card was compared with the card kept in its place and chains of
+    # slightly-different statements never merge unrelated cards.
+    followers: Dict[int, List[Tuple[int, float]]] = {}
+    duplicates: Set[int] = set()
+    for position in sorted(earlier):
+        leaders = [(one, similarity) for one, similarity in earlier[position] if one not in duplicates]
+        if leaders:
+            leader, similarity = min(leaders)
+            followers.setdefault(leader, []).append((position, similarity))
+            duplicates.add(position)
+
+    clusters = []
+    for leader, members in sorted(followers.items()):
+        positions = (leader,) + tuple(position for position, _ in members)
+        clusters.append(
+            DuplicateCluster(
+                positions=positions,
+                similarity=(1.0,) + tuple(round(similarity, 3) for _, similarity in members),
+                conflicts=()
+                if labels is None
+                else tuple(position for position, _ in members if labels[position] != labels[leader]),
+            )
+        )
+    return clusters
+
+
+def collapse(cards: Sequence[Card], clusters: Sequence[DuplicateCluster]) -> Iterator[Card]:
+    # The cards in order, minus every duplicate that shares its cluster's
+    # first card's label.
+    dropped = {position for cluster in clusters for position in cluster.dropped}
+    return (card for position, card in enumerate(cards) if position not in dropped)
+
+
+def write_report(path: str, cards: Sequence[Card], clusters: Sequence[DuplicateCluster]) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(("cluster", "id", "label", "action", "similarity", "statement"))
+        for cluster_no, cluster in enumerate(clusters, 1):
+            for rank, (position, similarity) in enumerate(zip(cluster.positions, cluster.similarity)):
+                card = cards[position]
+                action = "keep" if rank == 0 else "conflict" if position in cluster.conflicts else "drop"
+                writer.writerow((cluster_no, card.id, card.label, action, similarity, card.statement))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Find near-duplicate card statements.")
+    parser.add_argument("sources", nargs="+", help="JSONL or CSV packs, read in order")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="minimum shingle Jaccard similarity")
+    parser.add_argument("--report", help="write the clusters to this CSV instead of stdout")
+    args = parser.parse_args(argv)
+
+    try:
+        cards = list(iter_sources(args.sources))
+    except (OSError, PackError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    clusters = find_duplicates([card.statement for card in cards], [card.label for card in cards], args.threshold)
+    if args.report:
+        write_report(args.report, cards, clusters)
+    else:
+        for cluster in clusters:
+            tag = " (label conflict)" if cluster.conflict else ""
+            print(f"cluster of {len(cluster.positions)}{tag}:")
+            for position, similarity in zip(cluster.positions, cluster.similarity):
+                card = cards[position]
+                print(f"  {similarity:5.2f}  #{card.id:<6} {card.label:<4} {card.statement}")
+    dropped = sum(len(cluster.dropped) for cluster in clusters)
+    conflicts = sum(len(cluster.conflicts) for cluster in clusters)
+    print(f"{len(clusters)} clusters over {len(cards)} cards: {dropped} duplicates, {conflicts} label conflicts")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
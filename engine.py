@@ -0,0 +1,258 @@
+import time
+from array import array
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+from cards import Card
+from corpus import Corpus, card_positions
+from dealer import CardIndex, RoundKey, RoundSpec, bits_from_positions, deal_round, new_round_key, share_code
+from search import SearchIndex
+
+DECK_CACHE_SIZE = 4096
+POOL_CACHE_SIZE = 64
+
+
+class GameState:
+    # A session keeps its round key and position. The deck is dealt from the
+    # key on first use and then held as card ids, so reloading the card pack
+    # mid-round never changes which cards the round plays.
+    __slots__ = (
+        "round",
+        "reviews",
+        "query",
+        "spec",
+        "deck",
+        "index",
+        "score",
+        "flipped",
+        "revealed",
+        "answered",
+        "correct",
+        "last_action",
+        "shown_at",
+    )
+
+    def __init__(
+        self,
+        round_key: RoundKey,
+        reviews: Tuple[int, ...] = (),
+        query: str = "",
+        spec: Optional[RoundSpec] = None,
+    ) -> None:
+        self.round = round_key
+        self.reviews = reviews
+        self.query = query
+        # None deals the engine's default mix.
+        self.spec = spec
+        # Card ids as unsigned ints (4 bytes each, not a tuple of int
+        # objects), or None until the round is dealt.
+        self.deck: Optional[array] = None
+        self.index = 0
+        self.score = 0
+        self.flipped = False
+        self.revealed = False
+        self.answered = False
+        self.correct = False
+        self.last_action = ""
+        self.shown_at = time.monotonic()
+
+
+def encode_state(state: GameState) -> str:
+    # Compact snapshot for shared backends: round code, position, score,
+    # flag bits, review card ids, round spec, dealt card ids and the custom
+    # round query (last, as it is free text).
+    flags = state.flipped | state.revealed << 1 | state.answered << 2 | state.correct << 3
+    reviews = ",".join(map(str, state.reviews))
+    spec = state.spec.text if state.spec else ""
+    deck = ",".join(map(str, state.deck or ()))
+    return f"{state.round.code}|{state.index}|{state.score}|{flags}|{reviews}|{spec}|{deck}|{state.query}"
+
+
+def decode_state(snapshot: str) -> GameState:
+    code, index, score, flags, reviews, spec, deck, query = snapshot.split("|", 7)
+    state = GameState(
+        RoundKey.from_code(code),
+        parse_ids(reviews),
+        query,
+        RoundSpec.from_text(spec) if spec else None,
+    )
+    state.deck = parse_deck(deck)
+    state.index = int(index)
+    state.score = int(score)
+    bits = int(flags)
+    state.flipped = bool(bits & 1)
+    state.revealed = bool(bits & 2)
+    state.answered = bool(bits & 4)
+    state.correct = bool(bits & 8)
+    return state
+
+
+def parse_ids(text: str) -> Tuple[int, ...]:
+    return tuple(int(item) for item in text.split(",") if item)
+
+
+def parse_deck(text: str) -> Optional[array]:
+    # None for snapshots saved before decks were stored, which are dealt
+    # again from their key.
+    ids = parse_ids(text)
+    return array("I", ids) if ids else None
+
+
+class GameEngine:
+    def __init__(
+        self,
+        cards: Sequence[Card],
+        index: CardIndex,
+        spec: RoundSpec,
+        search: Optional[SearchIndex] = None,
+        positions: Optional[Dict[int, int]] = None,
+        retired: Optional[Dict[int, Card]] = None,
+    ) -> None:
+        self.cards = cards
+        self.index = index
+        self.search = search
+        self.spec = spec
+        self.positions = card_positions(cards) if positions is None else positions
+        # Cards removed by a pack reload, which rounds dealt before it still hold.
+        self.retired = retired or {}
+        # Positions fit in unsigned shorts for any corpus under 64k cards.
+        self.typecode = "H" if index.total <= 0xFFFF else "I"
+        self.deal = lru_cache(maxsize=DECK_CACHE_SIZE)(self._deal)
+        self.pool = lru_cache(maxsize=POOL_CACHE_SIZE)(self._pool)
+
+    def _pool(self, query: str = "", tags: Tuple[str, ...] = ()) -> CardIndex:
+        # Custom and filtered rounds deal from the cards matching their query
+        # and tags instead of the whole corpus; both are bitset ANDs.
+        if not tags and (not query or self.search is None):
+            return self.index
+        bits = self.index.select(tags)
+        if query and self.search is not None:
+            bits &= bits_from_positions(self.search.search(query))
+        return self.index.restrict(bits)
+
+    def _deal(
+        self,
+        key: RoundKey,
+        reviews: Tuple[int, ...] = (),
+        query: str = "",
+        spec: Optional[RoundSpec] = None,
+    ) -> Tuple[array, RoundKey]:
+        spec = spec or self.spec
+        pool = self.pool(query, spec.tags)
+        # Reviews are card ids; any no longer in the pack are skipped.
+        review_positions = [self.positions[card_id] for card_id in reviews if card_id in self.positions]
+        deck, next_key = deal_round(pool, key, spec.facts, spec.myths, spec.size, review_positions)
+        return array(self.typecode, deck), next_key
+
+    def deal_ids(
+        self,
+        key: RoundKey,
+        reviews: Tuple[int, ...] = (),
+        query: str = "",
+        spec: Optional[RoundSpec] = None,
+    ) -> array:
+        return array("I", [self.cards[position].id for position in self.deal(key, reviews, query, spec)[0]])
+
+    def card(self, card_id: int) -> Card:
+        position = self.positions.get(card_id)
+        return self.retired[card_id] if position is None else self.cards[position]
+
+    def spec_of(self, state: GameState) -> RoundSpec:
+        return state.spec or self.spec
+
+    def deck(self, state: GameState) -> array:
+        if state.deck is None:
+            state.deck = self.deal_ids(state.round, state.reviews, state.query, state.spec)
+        return state.deck
+
+    def new_game(self, round_key: Optional[RoundKey] = None, spec: Optional[RoundSpec] = None) -> GameState:
+        return GameState(round_key or new_round_key(), spec=spec)
+
+    def join(self, state: GameState, round_key: RoundKey, spec: Optional[RoundSpec] = None) -> None:
+        # The joined round plays the sharer's mix (None for the default), not
+        # the joiner's, so the same code deals the same cards.
+        state.round = round_key
+        state.reviews = ()
+        state.query = ""
+        state.spec = spec
+        self._reset(state)
+
+    def share_code(self, state: GameState) -> Optional[str]:
+        # None when no code can rebuild the deck: review cards and custom
+        # round queries belong to the learner who dealt it.
+        if state.reviews or state.query:
+            return None
+        spec = self.spec_of(state)
+        return share_code(state.round, None if spec == self.spec else spec)
+
+    def custom_round(self, state: GameState, query: str, spec: Optional[RoundSpec] = None) -> None:
+        # Starts a fresh round over the cards matching query ("" for the whole
+        # corpus). Reviews are left out: they may fall outside the matches.
+        state.round = new_round_key()
+        state.reviews = ()
+        state.query = query
+        state.spec = spec or state.spec
+        self._reset(state)
+
+    def restart(self, state: GameState, reviews: Tuple[int, ...] = (), spec: Optional[RoundSpec] = None) -> None:
+        # Play Again continues the learner's walk with the next round's key;
+        # review cards due for the learner replace fresh cards of their label
+        # (custom and filtered rounds skip reviews, which may not match).
+        state.round = self.deal(state.round, state.reviews, state.query, state.spec)[1]
+        state.spec = spec or state.spec
+        state.reviews = () if state.query or self.spec_of(state).tags else reviews
+        self._reset(state)
+
+    def _reset(self, state: GameState) -> None:
+        state.deck = None
+        state.index = 0
+        state.score = 0
+        state.flipped = False
+        state.revealed = False
+        state.answered = False
+        state.correct = False
+        state.last_action = ""
+        state.shown_at = time.monotonic()
+
+    def finished(self, state: GameState) -> bool:
+        return state.index >= len(self.deck(state))
+
+    def current_card(self, state: GameState) -> Card:
+        return self.card(self.deck(state)[state.index])
+
+    def answer(self, state: GameState, guess: str) -> bool:
+        if state.answered or self.finished(state):
+            return state.correct
+        state.answered = True
+        state.correct = self.current_card(state).label == guess
+        if state.correct:
+            state.score += 1
+        return state.correct
+
+    def flip(self, state: GameState) -> bool:
+        # Returns True the first time the current card's back is revealed.
+        state.flipped = not state.flipped
+        state.last_action = "flip"
+        first_reveal = state.flipped and not state.revealed
+        state.revealed = state.revealed or state.flipped
+        return first_reveal
+
+    def seconds_on_card(self, state: GameState) -> float:
+        return time.monotonic() - state.shown_at
+
+    def advance(self, state: GameState) -> None:
+        if not state.answered or self.finished(state):
+            return
+        state.index += 1
+        state.flipped = False
+        state.revealed = False
+        state.answered = False
+        state.correct = False
+        state.last_action = "next"
+        state.shown_at = time.monotonic()
+
+
+@lru_cache(maxsize=4)
+def engine_for(corpus: Corpus, spec: RoundSpec) -> GameEngine:
+    # One engine, and so one deal cache, per corpus version.
+    return GameEngine(corpus.cards, corpus.index, spec, corpus.search, corpus.positions, corpus.retired)
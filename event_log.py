@@ -0,0 +1,155 @@
+"""Append-only log of answer events.
+
+Events are JSON lines written to numbered segment files
+(answers-000001.jsonl, ...) that rotate at SEGMENT_BYTES. Appends only touch
+an in-memory buffer; a flusher thread writes buffered events in one write and
+one fsync per group.
+
+Usage:
+
+    python event_log.py replay logs/ --top 10
+"""
+
+import argparse
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from cards import load_cards
+
+DEFAULT_LOG_DIR = Path(os.environ.get("MYTH_OR_FACT_LOG_DIR", Path(__file__).resolve().parent / "logs"))
+SEGMENT_PREFIX = "answers-"
+SEGMENT_SUFFIX = ".jsonl"
+SEGMENT_BYTES = 64 * 1024 * 1024
+FLUSH_INTERVAL = 0.5
+FLUSH_EVENTS = 512
+
+
+def segment_paths(directory: str) -> List[Path]:
+    return sorted(Path(directory).glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+
+
+class EventLog:
+    def __init__(self, directory: str, segment_bytes: int = SEGMENT_BYTES) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        segments = segment_paths(str(self.directory))
+        self._segment = int(segments[-1].name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) if segments else 1
+        self._handle = self._open_segment()
+        self._buffer: List[str] = []
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._flusher = threading.Thread(target=self._flush_loop, name="event-log-flusher", daemon=True)
+        self._flusher.start()
+
+    def _open_segment(self):
+        path = self.directory / f"{SEGMENT_PREFIX}{self._segment:06d}{SEGMENT_SUFFIX}"
+        handle = open(path, "a+b")
+        # A crash mid-write can leave a torn last line. It is ended here, so
+        # the next event starts a line of its own instead of being glued onto
+        # it and skipped with it by iter_events.
+        if handle.seek(0, os.SEEK_END):
+            handle.seek(-1, os.SEEK_END)
+            if handle.read(1) != b"\n":
+                handle.write(b"\n")
+        return handle
+
+    def append(self, event: Dict[str, object]) -> None:
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+        with self._cond:
+            self._buffer.append(line)
+            if len(self._buffer) >= FLUSH_EVENTS:
+                self._cond.notify()
+
+    def record_answer(self, learner_id: str, card_id: int, guess: str, correct: bool, round_code: str) -> None:
+        self.append(
+            {
+                "t": round(time.time(), 3),
+                "learner": learner_id,
+                "card": card_id,
+                "guess": guess,
+                "correct": correct,
+                "round": round_code,
+            }
+        )
+
+    def flush(self) -> None:
+        # The buffer is swapped out under the lock and written outside it, so
+        # appends never wait for the disk.
+        with self._write_lock:
+            with self._cond:
+                lines, self._buffer = self._buffer, []
+            if not lines:
+                return
+            data = ("\n".join(lines) + "\n").encode("utf-8")
+            if self._handle.tell() and self._handle.tell() + len(data) > self.segment_bytes:
+                self._handle.close()
+                self._segment += 1
+                self._handle = self._open_segment()
+            self._handle.write(data)
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._buffer) >= FLUSH_EVENTS, timeout=FLUSH_INTERVAL)
+            self.flush()
+
+
+@lru_cache(maxsize=None)
+def open_log(directory: str = str(DEFAULT_LOG_DIR)) -> EventLog:
+    log = EventLog(directory)
+    atexit.register(log.flush)
+    return log
+
+
+def iter_events(directory: str) -> Iterator[Dict[str, object]]:
+    # Streams every segment line by line, oldest first; memory use does not
+    # depend on the size of the log. A torn line from a crash is skipped, even
+    # one cut inside a multi-byte character.
+    for path in segment_paths(directory):
+        with open(path, encoding="utf-8", errors="replace") as handle:
+            for line in handle:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def card_accuracy(events: Iterable[Dict[str, object]]) -> Dict[int, Tuple[int, int]]:
+    totals: Dict[int, List[int]] = defaultdict(lambda: [0, 0])
+    for event in events:
+        counts = totals[int(event["card"])]
+        counts[0] += 1
+        counts[1] += bool(event["correct"])
+    return {card_id: (answered, correct) for card_id, (answered, correct) in totals.items()}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay the answer event log.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    replay = commands.add_parser("replay", help="rebuild per-card accuracy from the log")
+    replay.add_argument("directory", nargs="?", default=str(DEFAULT_LOG_DIR))
+    replay.add_argument("--top", type=int, default=20, help="show the N most-missed cards")
+    args = parser.parse_args(argv)
+
+    statements = {card.id: card.statement for card in load_cards()}
+    accuracy = card_accuracy(iter_events(args.directory))
+    ranked = sorted(accuracy.items(), key=lambda item: item[1][1] / item[1][0])
+    print(f"{sum(answered for answered, _ in accuracy.values())} answers over {len(accuracy)} cards")
+    for card_id, (answered, correct) in ranked[:args.top]:
+        print(f"{correct / answered:6.1%} of {answered:>6}  #{card_id:<6} {statements.get(card_id, '?')}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""Offline HTML export of card packs.
+
+Renders a whole pack, or a set of seeded rounds dealt from it, to
+self-contained HTML pages for schools without reliable internet. Cards use the
+app's own template (render.card_html) and stylesheet, inlined into every page,
+with both faces laid out one after the other so pages print cleanly or save to
+PDF from the browser. Pages are rendered in a process pool; each worker writes
+its page straight to disk and only a bounded number of pages are in flight, so
+memory does not grow with the pack.
+
+Usage:
+
+    python exporter.py packs/core.jsonl -o export/
+    python exporter.py packs/big.mfpack -o export/ --rounds 30 --seed 7 --tags region:india
+"""
+
+import argparse
+import html
+import os
+import sys
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from cards import DEFAULT_PACK, PackError, load_cards
+from dealer import RoundSpec, class_round_keys, deal_round, load_index, share_code
+from parallel import bounded_map
+from render import card_html, pastel_class
+from theme import theme_css
+from translations import BASE_LOCALE, localize
+
+CARDS_PER_PAGE = 200
+
+# Flattens the flip animation so both faces show, front then back, and keeps
+# each card on one printed page.
+EXPORT_CSS = """
+body { font-family: "Source Sans Pro", sans-serif; max-width: 46rem; margin: 2rem auto; padding: 0 1rem;
+       background: #fbf9ff; color: #2d2942; }
+.flashcard, .flashcard.flipped { transform: none; animation: none; min-height: 0; box-shadow: none; }
+.card-face { position: relative; transform: none; opacity: 1 !important; backface-visibility: visible;
+             -webkit-backface-visibility: visible; margin-bottom: .5rem; }
+.card-back { border-top: 1px dashed rgba(59, 50, 93, .3); }
+.export-card { break-inside: avoid; page-break-inside: avoid; margin-bottom: 1.4rem; }
+.export-card ul { margin: .3rem 0 0 0; }
+.export-nav { margin: 1.5rem 0; }
+.fronts-only .card-back, .fronts-only .discussion { display: none; }
+@page { margin: 1.5cm; }
+@media print { body { background: none; margin: 0; max-width: none; } .export-nav { display: none; } }
+"""
+
+# One page to render: (page number, title, card positions).
+PageJob = Tuple[int, str, Sequence[int]]
+
+
+def page_name(page_no: int) -> str:
+    return f"page-{page_no:04d}.html"
+
+
+def page_head(title: str, locale: str) -> str:
+    lang = html.escape(locale or BASE_LOCALE)
+    return (
+        f"<!DOCTYPE html>\n<html lang='{lang}'>\n<head>\n<meta charset='utf-8'>\n"
+        f"<title>{html.escape(title)}</title>\n<style>{theme_css()}{EXPORT_CSS}</style>\n</head>\n"
+    )
+
+
+def render_page(
+    pack: str,
+    output: str,
+    job: PageJob,
+    locale: str = BASE_LOCALE,
+    answers: bool = True,
+    last_page: int = 0,
+) -> Tuple[int, str, int]:
+    # Runs in a worker: loads the (cached) pack, writes one page card by card
+    # and returns only its number, title and card count.
+    page_no, title, positions = job
+    cards = load_cards(pack)
+    path = Path(output) / page_name(page_no)
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(page_head(title, locale))
+        handle.write(f"<body class='{'' if answers else 'fronts-only'}'>\n<h1>{html.escape(title)}</h1>\n")
+        for number, position in enumerate(positions):
+            card = localize(cards[position], locale)
+            handle.write("<section class='export-card'>")
+            handle.write(card_html(card, answers, pastel_class(number), locale=locale))
+            if card.discussion:
+                handle.write("<div class='discussion'><h4>Discussion starters 💬</h4><ul>")
+                handle.writelines(f"<li>{html.escape(item)}</li>" for item in card.discussion)
+                handle.write("</ul></div>")
+            handle.write("</section>\n")
+        handle.write(page_nav(page_no, last_page))
+        handle.write("</body>\n</html>\n")
+    return page_no, title, len(positions)
+
+
+def page_nav(page_no: int, last_page: int) -> str:
+    links = ["<a href='index.html'>Contents</a>"]
+    if page_no > 1:
+        links.insert(0, f"<a href='{page_name(page_no - 1)}'>← Previous</a>")
+    if page_no < last_page:
+        links.append(f"<a href='{page_name(page_no + 1)}'>Next →</a>")
+    return f"<nav class='export-nav'>{' · '.join(links)}</nav>\n"
+
+
+def pack_jobs(total: int, cards_per_page: int) -> Iterator[PageJob]:
+    # Ranges pickle as three integers, so the parent never materialises a
+    # position list for the whole pack.
+    for page_no, start in enumerate(range(0, total, cards_per_page), 1):
+        stop = min(start + cards_per_page, total)
+        yield page_no, f"Cards {start + 1}–{stop} of {total}", range(start, stop)
+
+
+def round_jobs(pack: str, rounds: int, seed: int, spec: RoundSpec) -> Iterator[PageJob]:
+    # One page per round, titled with its round code so a class can play the
+    # same cards in the app afterwards.
+    index = load_index(pack)
+    if spec.tags:
+        index = index.restrict(index.select(spec.tags))
+    if not index.total:
+        raise PackError(f"no cards match {' '.join(spec.tags)}")
+    for page_no, key in enumerate(class_round_keys(seed, rounds), 1):
+        deck, _ = deal_round(index, key, spec.facts, spec.myths, spec.size)
+        yield page_no, f"Round {page_no} · code {share_code(key, spec)}", deck
+
+
+def export_pages(
+    pack: str,
+    output: str,
+    jobs: Iterator[PageJob],
+    last_page: int,
+    locale: str = BASE_LOCALE,
+    answers: bool = True,
+    workers: Optional[int] = None,
+) -> Iterator[Tuple[int, str, int]]:
+    # Pages come back in order. At most two pages per worker are outstanding.
+    return bounded_map(render_page, ((pack, output, job, locale, answers, last_page) for job in jobs), workers)
+
+
+def write_contents(output: str, title: str, pages: List[Tuple[int, str, int]], locale: str) -> None:
+    with open(Path(output) / "index.html", "w", encoding="utf-8") as handle:
+        handle.write(page_head(title, locale))
+        handle.write(f"<body>\n<h1>{html.escape(title)}</h1>\n<ol>\n")
+        for page_no, page_title, count in pages:
+            handle.write(f"<li><a href='{page_name(page_no)}'>{html.escape(page_title)}</a> ({count} cards)</li>\n")
+        handle.write("</ol>\n</body>\n</html>\n")
+
+
+def positive_int(text: str) -> int:
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export a card pack to offline, printable HTML pages.")
+    parser.add_argument("pack", nargs="?", default=str(DEFAULT_PACK), help="JSONL, CSV or compiled .mfpack")
+    parser.add_argument("-o", "--output", required=True, help="directory to write the pages to")
+    parser.add_argument("--cards-per-page", type=positive_int, default=CARDS_PER_PAGE)
+    parser.add_argument("--rounds", type=int, default=0, help="export N seeded rounds instead of the whole pack")
+    parser.add_argument("--seed", type=int, default=0, help="seed for --rounds; the same seed deals the same rounds")
+    parser.add_argument("--facts", type=int, default=5, help="facts per round")
+    parser.add_argument("--myths", type=int, default=10, help="myths per round")
+    parser.add_argument("--tags", nargs="*", default=[], help="deal rounds only from cards with these tags")
+    parser.add_argument("--locale", default=BASE_LOCALE, help="card language, e.g. hi")
+    parser.add_argument("--no-answers", action="store_true", help="print statements only, as a quiz sheet")
+    parser.add_argument("--workers", type=int, default=None, help="rendering processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    try:
+        total = len(load_cards(args.pack))
+        os.makedirs(args.output, exist_ok=True)
+        if args.rounds:
+            spec = RoundSpec(args.facts, args.myths, tuple(args.tags))
+            jobs, last_page = round_jobs(args.pack, args.rounds, args.seed, spec), args.rounds
+            title = f"{args.rounds} rounds of {spec.text} (seed {args.seed})"
+        else:
+            jobs, last_page = pack_jobs(total, args.cards_per_page), -(-total // args.cards_per_page)
+            title = f"All {total} cards"
+        pages = list(
+            export_pages(args.pack, args.output, jobs, last_page, args.locale, not args.no_answers, args.workers)
+        )
+        write_contents(args.output, title, pages, args.locale)
+    except (OSError, PackError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    print(f"exported {sum(count for _, _, count in pages)} cards to {len(pages)} pages in {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""Bulk import of contributed cards.
+
+Streams CSV/JSONL sources in chunks, normalises and validates every row in a
+process pool, writes the valid cards to a compiled pack and reports rejected
+rows. Only a bounded number of chunks are in flight at once, so row text never
+piles up in memory, and the pack writer keeps its duplicate-id and string
+index on disk, so memory stays flat however many rows are imported.
+
+Usage:
+
+    python importer.py submissions.csv more.jsonl -o packs/contrib.mfpack --errors rejected.csv
+"""
+
+import argparse
+import csv
+import json
+import sys
+import unicodedata
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from cardpack import EncodedCard, PackWriter, encode_card
+from cards import Card, PackError, card_from_dict, read_rows, validate_card
+from parallel import bounded_map
+
+CHUNK_ROWS = 2000
+MAX_STATEMENT_CHARS = 300
+MAX_EXPLANATION_CHARS = 1500
+MAX_PROMPT_CHARS = 300
+MAX_PROMPTS = 6
+
+# A row's outcome: (source, row number, encoded card or None, error message).
+# Workers return cards already encoded for the pack, so the parent process
+# only deduplicates strings and writes.
+RowResult = Tuple[str, int, Optional[EncodedCard], str]
+
+
+def normalize_text(text: str) -> str:
+    # NFC so composed and decomposed accents compare equal, and runs of
+    # whitespace (including newlines pasted into spreadsheet cells) collapsed.
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def normalize_row(row: Dict[str, object]) -> Dict[str, object]:
+    normalized: Dict[str, object] = {}
+    for key, value in row.items():
+        # Short CSV rows leave trailing cells as None: treat them as missing.
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = normalize_text(value)
+        elif isinstance(value, list):
+            value = [normalize_text(item) if isinstance(item, str) else item for item in value]
+        normalized[key.strip() if isinstance(key, str) else key] = value
+    return normalized
+
+
+def check_lengths(card: Card) -> None:
+    if len(card.statement) > MAX_STATEMENT_CHARS:
+        raise PackError(f"statement is longer than {MAX_STATEMENT_CHARS} characters")
+    if len(card.explanation) > MAX_EXPLANATION_CHARS:
+        raise PackError(f"explanation is longer than {MAX_EXPLANATION_CHARS} characters")
+    if len(card.discussion) > MAX_PROMPTS:
+        raise PackError(f"at most {MAX_PROMPTS} discussion prompts are allowed, got {len(card.discussion)}")
+    for prompt in card.discussion:
+        if len(prompt) > MAX_PROMPT_CHARS:
+            raise PackError(f"discussion prompt is longer than {MAX_PROMPT_CHARS} characters")
+
+
+def import_row(row: Union[str, Dict[str, object]]) -> Card:
+    # JSONL rows arrive as raw lines so the JSON decoding happens in the
+    # workers too.
+    if isinstance(row, str):
+        row = json.loads(row)
+        if not isinstance(row, dict):
+            raise PackError("row is not a JSON object")
+    card = card_from_dict(normalize_row(row))
+    validate_card(card)
+    check_lengths(card)
+    return card
+
+
+def import_chunk(source: str, first_row: int, rows: List[Union[str, Dict[str, object]]]) -> List[RowResult]:
+    results: List[RowResult] = []
+    for row_no, row in enumerate(rows, first_row):
+        if row == "":
+            continue
+        try:
+            results.append((source, row_no, encode_card(import_row(row)), ""))
+        except KeyError as exc:
+            results.append((source, row_no, None, f"missing field {exc.args[0]!r}"))
+        except (TypeError, ValueError, AttributeError) as exc:
+            results.append((source, row_no, None, str(exc) or type(exc).__name__))
+    return results
+
+
+def iter_raw_rows(path: str) -> Iterator[Union[str, Dict[str, object]]]:
+    # Blank JSONL lines are skipped but still counted, so reported row
+    # numbers match line numbers in the source.
+    if path.endswith(".csv"):
+        yield from read_rows(path)
+        return
+    with open(path, encoding="utf-8-sig") as handle:
+        for line in handle:
+            yield line if line.strip() else ""
+
+
+def iter_chunks(paths: Iterable[str], chunk_rows: int) -> Iterator[Tuple[str, int, list]]:
+    for path in paths:
+        rows = iter_raw_rows(path)
+        first_row = 1
+        # CSV row numbers count the header as line 1.
+        offset = 1 if path.endswith(".csv") else 0
+        while True:
+            chunk = list(islice(rows, chunk_rows))
+            if not chunk:
+                break
+            yield path, first_row + offset, chunk
+            first_row += len(chunk)
+
+
+def import_rows(
+    paths: Sequence[str],
+    workers: Optional[int] = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> Iterator[RowResult]:
+    # Results come back in input order. At most two chunks per worker are
+    # outstanding, which bounds the rows held in memory however large the
+    # sources are.
+    for results in bounded_map(import_chunk, iter_chunks(paths, chunk_rows), workers):
+        yield from results
+
+
+class ImportReport:
+    def __init__(self, errors_path: Optional[str] = None) -> None:
+        self.accepted = 0
+        self.rejected = 0
+        self._handle = open(errors_path, "w", encoding="utf-8", newline="") if errors_path else None
+        self._writer = csv.writer(self._handle) if self._handle else None
+        if self._writer:
+            self._writer.writerow(("source", "row", "error"))
+
+    def reject(self, source: str, row_no: int, error: str) -> None:
+        self.rejected += 1
+        if self._writer:
+            self._writer.writerow((source, row_no, error))
+        else:
+            print(f"{source} row {row_no}: {error}", file=sys.stderr)
+
+    def write(self, results: Iterable[RowResult], writer: PackWriter) -> None:
+        # Valid cards go to the pack in input order. The writer rejects a
+        # repeated id, which is reported here with the first card kept.
+        for source, row_no, encoded, error in results:
+            if encoded is None:
+                self.reject(source, row_no, error)
+                continue
+            try:
+                writer.add_encoded(encoded)
+            except PackError as exc:
+                self.reject(source, row_no, str(exc))
+            else:
+                self.accepted += 1
+
+    def close(self) -> None:
+        if self._handle:
+            self._handle.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Validate contributed cards and compile them into a pack.")
+    parser.add_argument("sources", nargs="+", help="CSV or JSONL files")
+    parser.add_argument("-o", "--output", required=True, help="compiled .mfpack to write")
+    parser.add_argument("--errors", help="write rejected rows to this CSV instead of stderr")
+    parser.add_argument("--workers", type=int, default=None, help="validation processes (default: all cores)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    report = ImportReport(args.errors)
+    try:
+        with PackWriter(args.output) as writer:
+            report.write(import_rows(args.sources, args.workers, args.chunk_rows), writer)
+    except (OSError, csv.Error) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        report.close()
+    print(f"imported {report.accepted} cards into {args.output}, rejected {report.rejected} rows")
+    return 1 if report.rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
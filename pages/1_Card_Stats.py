@@ -0,0 +1,58 @@
+import os
+
+import streamlit as st
+
+from backends import open_backend
+from card_stats import open_card_stats
+from corpus import open_corpus
+from theme import theme_url
+
+st.set_page_config(page_title="Card statistics", page_icon="📊", layout="wide")
+st.markdown(f"<link rel='stylesheet' href='{theme_url()}'>", unsafe_allow_html=True)
+
+ADMIN_TOKEN = os.environ.get("MYTH_OR_FACT_ADMIN_TOKEN", "")
+
+if ADMIN_TOKEN and st.query_params.get("admin") != ADMIN_TOKEN:
+    st.error("This page is for teachers. Open it with the admin token in the `admin` query parameter.")
+    st.stop()
+
+st.header("📊 Card statistics")
+BACKEND = open_backend()
+scope = "shared by every app worker" if BACKEND.shared else "for this server process"
+st.caption(f"Live counters {scope}, updated on every answer.")
+
+CORPUS = open_corpus().current
+rows = open_card_stats(BACKEND).rows()
+if not rows:
+    st.info("No answers recorded yet.")
+    st.stop()
+
+
+def statement(card_id: int) -> str:
+    # Only answered cards are decoded; cards removed by a reload keep their
+    # statistics.
+    position = CORPUS.positions.get(card_id)
+    if position is not None:
+        return CORPUS.cards[position].statement
+    card = CORPUS.retired.get(card_id)
+    return "?" if card is None else card.statement
+
+
+for row in rows:
+    row["statement"] = statement(row["card_id"])
+rows.sort(key=lambda row: row["miss_rate"], reverse=True)
+
+st.dataframe(
+    rows,
+    column_order=("card_id", "statement", "answers", "miss_rate", "mean_seconds", "flip_rate"),
+    column_config={
+        "card_id": st.column_config.NumberColumn("Card"),
+        "statement": st.column_config.TextColumn("Statement", width="large"),
+        "answers": st.column_config.NumberColumn("Answers"),
+        "miss_rate": st.column_config.ProgressColumn("Miss rate", min_value=0.0, max_value=1.0, format="percent"),
+        "mean_seconds": st.column_config.NumberColumn("Mean time to answer", format="%.1f s"),
+        "flip_rate": st.column_config.ProgressColumn("Flip rate", min_value=0.0, max_value=1.0, format="percent"),
+    },
+    hide_index=True,
+    width="stretch",
+)
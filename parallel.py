@@ -0,0 +1,31 @@
+"""Ordered, bounded process-pool mapping for the bulk tools.
+
+Jobs are submitted lazily with at most two per worker outstanding, so a long
+job stream is never materialised and only a few results wait in memory.
+Results come back in job order.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Deque, Iterable, Iterator, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def bounded_map(function: Callable[..., T], jobs: Iterable[Tuple], workers: Optional[int] = None) -> Iterator[T]:
+    # `function` is called with each job's arguments. One worker runs the
+    # jobs in this process; None uses every core.
+    if workers == 1:
+        for args in jobs:
+            yield function(*args)
+        return
+    workers = workers or os.cpu_count() or 1
+    pending: Deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for args in jobs:
+            pending.append(pool.submit(function, *args))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,297 @@
+import atexit
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from dealer import RoundKey, RoundSpec
+from engine import GameState, parse_deck, parse_ids
+from scheduler import LeitnerScheduler
+
+DEFAULT_DB = Path(os.environ.get("MYTH_OR_FACT_DB", Path(__file__).resolve().parent / "progress.db"))
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 0.25
+# Seconds between attempts to write a batch the database refused.
+RETRY_INTERVAL = 1.0
+FLUSH_TIMEOUT = 10.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    learner_id TEXT PRIMARY KEY,
+    round_code TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    flipped INTEGER NOT NULL,
+    answered INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    reviews TEXT NOT NULL DEFAULT '',
+    query TEXT NOT NULL DEFAULT '',
+    spec TEXT NOT NULL DEFAULT '',
+    deck TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS answers (
+    learner_id TEXT NOT NULL,
+    card_id INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    answered_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_by_learner ON answers (learner_id, answered_at);
+CREATE TABLE IF NOT EXISTS rounds (
+    learner_id TEXT NOT NULL,
+    round_code TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rounds_by_learner ON rounds (learner_id, finished_at);
+CREATE TABLE IF NOT EXISTS review_cards (
+    learner_id TEXT NOT NULL,
+    card_id INTEGER NOT NULL,
+    state INTEGER NOT NULL,
+    PRIMARY KEY (learner_id, card_id)
+);
+CREATE TABLE IF NOT EXISTS review_rounds (
+    learner_id TEXT PRIMARY KEY,
+    round INTEGER NOT NULL
+);
+"""
+
+SessionRow = Tuple[str, str, int, int, int, int, int, float, str, str, str, str]
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+def session_row(learner_id: str, state: GameState) -> SessionRow:
+    return (
+        learner_id,
+        state.round.code,
+        state.index,
+        state.score,
+        int(state.flipped),
+        int(state.answered),
+        int(state.correct),
+        time.time(),
+        ",".join(map(str, state.reviews)),
+        state.query,
+        state.spec.text if state.spec else "",
+        ",".join(map(str, state.deck or ())),
+    )
+
+
+def state_from_row(row: SessionRow) -> GameState:
+    _, round_code, position, score, flipped, answered, correct, _, reviews, query, spec, deck = row
+    round_spec = RoundSpec.from_text(spec) if spec else None
+    state = GameState(RoundKey.from_code(round_code), parse_ids(reviews), query, round_spec)
+    state.deck = parse_deck(deck)
+    state.index = position
+    state.score = score
+    state.flipped = bool(flipped)
+    state.answered = bool(answered)
+    state.correct = bool(correct)
+    return state
+
+
+class ProgressStore:
+    # Writes are queued and committed in batches by a single writer thread, so
+    # answer clicks never wait on disk. Snapshots still in the queue are served
+    # from memory, so a refresh straight after a click resumes correctly.
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with _connect(path) as connection:
+            connection.executescript(SCHEMA)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(sessions)")}
+            for column in ("reviews", "query", "spec", "deck"):
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE sessions ADD COLUMN {column} TEXT NOT NULL DEFAULT ''")
+            # Schedules used to be stored as one text snapshot per learner;
+            # split any left over into per-card rows.
+            tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if "schedules" in tables:
+                for learner_id, text in connection.execute("SELECT learner_id, schedule FROM schedules").fetchall():
+                    scheduler = LeitnerScheduler.from_text(text)
+                    connection.execute(
+                        "INSERT OR REPLACE INTO review_rounds VALUES (?, ?)", (learner_id, scheduler.round)
+                    )
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO review_cards VALUES (?, ?, ?)",
+                        ((learner_id, card_id, state) for card_id, state in scheduler.cards.items()),
+                    )
+                connection.execute("DROP TABLE schedules")
+        self._queue: "queue.Queue[Tuple[str, tuple]]" = queue.Queue()
+        self._pending: Dict[str, SessionRow] = {}
+        # Review schedule rows not yet committed: per learner, by card id,
+        # and the learner's round counter.
+        self._pending_reviews: Dict[str, Dict[int, tuple]] = {}
+        self._pending_review_rounds: Dict[str, tuple] = {}
+        self._pending_lock = threading.Lock()
+        # One read connection behind a lock: reads are rare (a session's first
+        # rerun), and Streamlit runs reruns on fresh threads, so a per-thread
+        # connection would be reopened nearly every time.
+        self._read_connection = _connect(path)
+        self._read_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._write_loop, name="progress-writer", daemon=True)
+        self._writer.start()
+
+    def save_session(self, learner_id: str, state: GameState) -> None:
+        row = session_row(learner_id, state)
+        with self._pending_lock:
+            self._pending[learner_id] = row
+        self._queue.put(("session", row))
+
+    def save_review(self, learner_id: str, card_id: int, state: int) -> None:
+        # One card's packed scheduler state; a click writes only the cards it
+        # rescheduled, never the learner's whole schedule.
+        row = (learner_id, card_id, state)
+        with self._pending_lock:
+            self._pending_reviews.setdefault(learner_id, {})[card_id] = row
+        self._queue.put(("review", row))
+
+    def save_review_round(self, learner_id: str, round_no: int) -> None:
+        row = (learner_id, round_no)
+        with self._pending_lock:
+            self._pending_review_rounds[learner_id] = row
+        self._queue.put(("review_round", row))
+
+    def record_answer(self, learner_id: str, card_id: int, correct: bool) -> None:
+        self._queue.put(("answer", (learner_id, card_id, int(correct), time.time())))
+
+    def record_round(self, learner_id: str, round_code: str, score: int, total: int) -> None:
+        self._queue.put(("round", (learner_id, round_code, score, total, time.time())))
+
+    def load_session(self, learner_id: str) -> Optional[GameState]:
+        with self._pending_lock:
+            row = self._pending.get(learner_id)
+        if row is None:
+            with self._read_lock:
+                row = self._read_connection.execute(
+                    "SELECT * FROM sessions WHERE learner_id = ?", (learner_id,)
+                ).fetchone()
+        return state_from_row(row) if row else None
+
+    def load_schedule(self, learner_id: str) -> Optional[LeitnerScheduler]:
+        with self._read_lock:
+            round_row = self._read_connection.execute(
+                "SELECT round FROM review_rounds WHERE learner_id = ?", (learner_id,)
+            ).fetchone()
+            states = dict(
+                self._read_connection.execute(
+                    "SELECT card_id, state FROM review_cards WHERE learner_id = ?", (learner_id,)
+                )
+            )
+        with self._pending_lock:
+            pending_round = self._pending_review_rounds.get(learner_id)
+            states.update((card_id, row[2]) for card_id, row in self._pending_reviews.get(learner_id, {}).items())
+        round_no = pending_round[1] if pending_round else round_row[0] if round_row else None
+        if round_no is None and not states:
+            return None
+        return LeitnerScheduler.from_states(round_no or 0, states.items())
+
+    def flush(self, timeout: Optional[float] = FLUSH_TIMEOUT) -> bool:
+        # Waits for everything queued so far to be written. Bounded, as it
+        # runs at interpreter exit: a stuck database must not hang shutdown.
+        done = threading.Event()
+        self._queue.put(("flush", (done,)))
+        return done.wait(timeout)
+
+    def _write_loop(self) -> None:
+        # Nothing may end this thread: saves would pile up unwritten and every
+        # flush would time out. A busy or full database keeps the batch for
+        # the next attempt; any other error would recur, so the batch is
+        # dropped. Flush waiters are released either way.
+        connection = _connect(self.path)
+        batch: List[Tuple[str, tuple]] = []
+        while True:
+            try:
+                batch.append(self._queue.get(timeout=RETRY_INTERVAL if batch else None))
+            except queue.Empty:
+                pass
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < BATCH_SIZE and batch[-1][0] != "flush":
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            waiters = [row[0] for kind, row in batch if kind == "flush"]
+            batch = [item for item in batch if item[0] != "flush"]
+            try:
+                self._commit(connection, batch)
+            except sqlite3.OperationalError as exc:
+                print(f"progress store write failed, retrying {len(batch)} rows: {exc!r}", file=sys.stderr)
+            except Exception as exc:
+                print(f"progress store write failed, dropping {len(batch)} rows: {exc!r}", file=sys.stderr)
+                self._forget(batch)
+                batch = []
+            else:
+                self._forget(batch)
+                batch = []
+            finally:
+                for waiter in waiters:
+                    waiter.set()
+
+    def _commit(self, connection: sqlite3.Connection, batch: List[Tuple[str, tuple]]) -> None:
+        sessions, reviews, review_rounds, answers, rounds = _group(batch)
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", sessions.values()
+            )
+            connection.executemany("INSERT OR REPLACE INTO review_cards VALUES (?, ?, ?)", reviews.values())
+            connection.executemany("INSERT OR REPLACE INTO review_rounds VALUES (?, ?)", review_rounds.values())
+            connection.executemany("INSERT INTO answers VALUES (?, ?, ?, ?)", answers)
+            connection.executemany("INSERT INTO rounds VALUES (?, ?, ?, ?, ?)", rounds)
+
+    def _forget(self, batch: List[Tuple[str, tuple]]) -> None:
+        # Drops the batch's rows from the pending overlays, unless a newer
+        # save for the same key has arrived since.
+        sessions, reviews, review_rounds, _, _ = _group(batch)
+        with self._pending_lock:
+            for learner_id, row in sessions.items():
+                if self._pending.get(learner_id) is row:
+                    del self._pending[learner_id]
+            for (learner_id, card_id), row in reviews.items():
+                pending = self._pending_reviews.get(learner_id, {})
+                if pending.get(card_id) is row:
+                    del pending[card_id]
+                    if not pending:
+                        del self._pending_reviews[learner_id]
+            for learner_id, row in review_rounds.items():
+                if self._pending_review_rounds.get(learner_id) is row:
+                    del self._pending_review_rounds[learner_id]
+
+
+def _group(batch: List[Tuple[str, tuple]]) -> Tuple[dict, dict, dict, list, list]:
+    # Only the latest snapshot per key is written; answers and rounds are
+    # appended in order.
+    sessions: Dict[str, SessionRow] = {}
+    reviews: Dict[Tuple[str, int], tuple] = {}
+    review_rounds: Dict[str, tuple] = {}
+    answers, rounds = [], []
+    for kind, row in batch:
+        if kind == "session":
+            sessions[row[0]] = row
+        elif kind == "review":
+            reviews[row[0], row[1]] = row
+        elif kind == "review_round":
+            review_rounds[row[0]] = row
+        elif kind == "answer":
+            answers.append(row)
+        else:
+            rounds.append(row)
+    return sessions, reviews, review_rounds, answers, rounds
+
+
+@lru_cache(maxsize=None)
+def open_store(path: str = str(DEFAULT_DB)) -> ProgressStore:
+    store = ProgressStore(path)
+    atexit.register(store.flush)
+    return store
@@ -0,0 +1,89 @@
+import html
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+
+from cards import Card
+
+PASTEL_CLASSES = ("pastel-a", "pastel-b", "pastel-c", "pastel-d")
+CARD_CACHE_SIZE = 2048
+
+
+class RenderCache:
+    # Bounded LRU shared by every session in the process. Rendering is pure, so
+    # a race between two sessions at worst renders the same fragment twice.
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, render: Callable[[], str]) -> str:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = render()
+        with self._lock:
+            self._entries[key] = value
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+
+CARD_CACHE = RenderCache(CARD_CACHE_SIZE)
+
+
+def pastel_class(position: int) -> str:
+    return PASTEL_CLASSES[position % len(PASTEL_CLASSES)]
+
+
+def card_html(card: Card, flipped: bool, pastel: str, anim_class: str = "", locale: str = "") -> str:
+    statement_html = html.escape(card.statement)
+    label = card.label
+    cls = "fact" if label == "FACT" else "myth"
+    icon = "✅" if label == "FACT" else "🧠"
+    if flipped:
+        back_content = (
+            f"<span class='chip {cls}'>{icon} {label}</span>"
+            "<h4 style='margin: .7rem 0 .4rem 0;'>Explanation</h4>"
+            f"<p class='statement-text'>{html.escape(card.explanation)}</p>"
+        )
+    else:
+        back_content = "<p class='statement-text'>Flip the card to see the explanation.</p>"
+
+    flipped_class = "flipped" if flipped else ""
+    lang = f" lang='{html.escape(locale)}'" if locale else ""
+    return f"""
+        <div class='flashcard-wrap {anim_class}'{lang}>
+          <div class='flashcard {pastel} {flipped_class}'>
+            <div class='card-face card-front'>
+                <span class='statement-tag'>✨ Statement Card</span>
+                <h3 style='margin: .35rem 0 .25rem 0;'>🗣️ Statement</h3>
+                <p class='statement-text'>{statement_html}</p>
+            </div>
+            <div class='card-face card-back'>{back_content}</div>
+          </div>
+        </div>
+        """
+
+
+def render_card(card: Card, flipped: bool, pastel: str, anim_class: str = "", locale: str = "") -> str:
+    # Keyed by the card itself rather than its id: translations and cards
+    # edited by a pack reload share the id but not the text.
+    key = (card, locale, flipped, pastel, anim_class)
+    return CARD_CACHE.get(key, lambda: card_html(card, flipped, pastel, anim_class, locale))
@@ -0,0 +1,103 @@
+"""Client-side rounds.
+
+The whole dealt round (statements, labels, explanations and discussion
+prompts) is sent once to a static custom component in frontend/round_bundle/.
+Flips, answers and moving to the next card then happen in the browser, which
+posts every answer back in one batch when the round ends: two server passes
+per round instead of about three per card.
+
+The labels shipped to the browser only drive its feedback. The server scores
+the batch against its own deck, so an edited payload cannot raise a score.
+"""
+
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import streamlit.components.v1 as components
+
+from cards import LABELS, Card
+from translations import LocaleCache, localize
+
+FRONTEND_DIR = Path(__file__).resolve().parent / "frontend" / "round_bundle"
+BUNDLE_CACHE_SIZE = 1024
+
+# One answered card from the browser: (deck index, guess, seconds on the
+# card, whether its back was shown).
+Answer = Tuple[int, str, float, bool]
+
+_component = components.declare_component("round_bundle", path=str(FRONTEND_DIR))
+
+
+def round_id(round_code: str, reviews: Sequence[int], spec_text: str, query: str) -> str:
+    # Names one dealt deck. The browser keeps its progress under it and the
+    # server only accepts a batch for the deck it is currently playing.
+    text = "|".join((round_code, ",".join(map(str, reviews)), spec_text, query))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class RoundBundles:
+    # Compact card rows, [statement, is_fact, explanation, [prompts]], per deck
+    # and locale, so learners playing the same round code share one bundle.
+    # Keyed by the cards themselves: a pack reload that edits a card misses
+    # the cache instead of serving the old text.
+    def __init__(self, translations: Optional[LocaleCache] = None) -> None:
+        self.translations = translations
+        self.rows = lru_cache(maxsize=BUNDLE_CACHE_SIZE)(self._rows)
+
+    def _rows(self, cards: Tuple[Card, ...], locale: str) -> List[list]:
+        rows = []
+        for card in cards:
+            card = localize(card, locale, self.translations)
+            rows.append([card.statement, card.label == "FACT", card.explanation, list(card.discussion)])
+        return rows
+
+
+@lru_cache(maxsize=None)
+def open_bundles(translations: Optional[LocaleCache] = None) -> RoundBundles:
+    # One cache for the process; the app script builds nothing that must
+    # outlive a rerun.
+    return RoundBundles(translations)
+
+
+def round_bundle(
+    rows: List[list],
+    bundle_id: str,
+    start_index: int,
+    start_score: int,
+    theme: str,
+    locale: str,
+    key: str,
+    on_change=None,
+) -> None:
+    _component(
+        cards=rows,
+        round=bundle_id,
+        index=start_index,
+        score=start_score,
+        theme=theme,
+        locale=locale,
+        key=key,
+        on_change=on_change,
+        default=None,
+    )
+
+
+def parse_batch(value: object, bundle_id: str) -> List[Answer]:
+    # The component's value: {"round": id, "answers": [[index, guess,
+    # seconds, flipped], ...]}. Anything else raises ValueError.
+    if not isinstance(value, dict) or value.get("round") != bundle_id:
+        raise ValueError("answer batch is for another round")
+    answers = value.get("answers")
+    if not isinstance(answers, list):
+        raise ValueError("answer batch has no answers")
+    batch: List[Answer] = []
+    for item in answers:
+        if not isinstance(item, list) or len(item) != 4:
+            raise ValueError(f"malformed answer {item!r}")
+        index, guess, seconds, flipped = item
+        if not isinstance(index, int) or guess not in LABELS or not isinstance(seconds, (int, float)):
+            raise ValueError(f"malformed answer {item!r}")
+        batch.append((index, guess, max(0.0, float(seconds)), bool(flipped)))
+    return batch
@@ -0,0 +1,91 @@
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Rounds to wait before a card comes back, indexed by Leitner box. A miss
+# sends the card back to the first box.
+BOX_INTERVALS = (1, 2, 4, 8, 16)
+BOX_BITS = 3
+ID_BITS = 32
+
+
+class LeitnerScheduler:
+    # Per-learner review state. Each reviewed card costs one packed int in
+    # `cards` (due round and box) and one packed int in the heap (due round and
+    # card id); rescheduled cards leave stale heap entries behind that
+    # are skipped lazily when popped.
+    __slots__ = ("round", "cards", "heap")
+
+    def __init__(self) -> None:
+        self.round = 0
+        self.cards: Dict[int, int] = {}
+        self.heap: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def box(self, card_id: int) -> int:
+        return self.cards.get(card_id, 0) & ((1 << BOX_BITS) - 1)
+
+    def _schedule(self, card_id: int, box: int, due: int) -> None:
+        self.cards[card_id] = due << BOX_BITS | box
+        heapq.heappush(self.heap, due << ID_BITS | card_id)
+        if len(self.heap) > 2 * len(self.cards) + 64:
+            self.heap = [state >> BOX_BITS << ID_BITS | card for card, state in self.cards.items()]
+            heapq.heapify(self.heap)
+
+    @property
+    def text(self) -> str:
+        # The round counter and each card's packed state, as one string.
+        return f"{self.round}:" + ",".join(f"{card_id}={state}" for card_id, state in self.cards.items())
+
+    @classmethod
+    def from_text(cls, text: str) -> "LeitnerScheduler":
+        round_no, _, items = text.partition(":")
+        states = (item.partition("=") for item in items.split(",") if item)
+        return cls.from_states(int(round_no), ((int(card_id), int(state)) for card_id, _, state in states))
+
+    @classmethod
+    def from_states(cls, round_no: int, states: Iterable[Tuple[int, int]]) -> "LeitnerScheduler":
+        # Rebuilds a schedule from (card id, packed state) pairs, as saved by
+        # the progress store one card at a time.
+        scheduler = cls()
+        scheduler.round = round_no
+        scheduler.cards.update(states)
+        scheduler.heap = [state >> BOX_BITS << ID_BITS | card for card, state in scheduler.cards.items()]
+        heapq.heapify(scheduler.heap)
+        return scheduler
+
+    def state(self, card_id: int) -> Optional[int]:
+        # The packed due round and box, or None for a card never missed.
+        return self.cards.get(card_id)
+
+    def record(self, card_id: int, correct: bool) -> None:
+        # Only misses enter the schedule; a card answered correctly on first
+        # sight is never reviewed.
+        if correct and card_id not in self.cards:
+            return
+        box = min(self.box(card_id) + 1, len(BOX_INTERVALS) - 1) if correct else 0
+        self._schedule(card_id, box, self.round + BOX_INTERVALS[box])
+
+    def next_round(self) -> None:
+        self.round += 1
+
+    def take_due(self, limit: int) -> List[int]:
+        # O(k log n): pops only as many heap entries as there are due cards
+        # (plus stale ones). Taken cards are provisionally rescheduled for the
+        # next round, so a review that is never answered still comes back.
+        due: List[int] = []
+        while self.heap and len(due) < limit:
+            entry = self.heap[0]
+            when, card_id = entry >> ID_BITS, entry & ((1 << ID_BITS) - 1)
+            if when > self.round:
+                break
+            heapq.heappop(self.heap)
+            state = self.cards.get(card_id)
+            # A card rescheduled for the same round has two live entries.
+            if state is None or state >> BOX_BITS != when or card_id in due:
+                continue
+            due.append(card_id)
+        for card_id in due:
+            self._schedule(card_id, self.box(card_id), self.round + 1)
+        return due
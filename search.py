@@ -0,0 +1,177 @@
+"""Inverted index over card text.
+
+Built once per corpus from each card's statement, explanation and discussion
+prompts. Queries are whitespace-separated terms that must all match:
+
+    accent            cards containing the word "accent"
+    sanskr*           any word starting with "sanskr"
+    "sign language"   the words next to each other, in one field
+
+Adjacent word pairs are indexed too, so two-word phrases are answered from
+postings alone; longer phrases are confirmed on the matching cards' text.
+"""
+
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from cards import Card
+from dealer import CardChange
+
+TOKEN = re.compile(r"\w+")
+QUERY_TERM = re.compile(r'"([^"]*)"?|(\S+)')
+QUERY_CACHE_SIZE = 256
+
+
+def normalize(text: str) -> str:
+    # Case and accents are folded so "Créole" and "creole" index alike.
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(normalize(text))
+
+
+def card_terms(card: Card) -> Set[str]:
+    # Every word and every adjacent pair ("sign language") within one field.
+    terms = set()
+    for text in card_fields(card):
+        tokens = tokenize(text)
+        terms.update(tokens)
+        terms.update(map(" ".join, zip(tokens, tokens[1:])))
+    return terms
+
+
+def card_fields(card: Card) -> Iterator[str]:
+    yield card.statement
+    yield card.explanation
+    yield from card.discussion
+
+
+def parse_query(query: str) -> List[Tuple[str, ...]]:
+    # Each term is a tuple of tokens: one token for a word or prefix (kept
+    # with its trailing "*"), several for a quoted phrase.
+    terms = []
+    for phrase, word in QUERY_TERM.findall(query):
+        if word:
+            tokens = tokenize(word)
+            if word.endswith("*") and tokens:
+                tokens[-1] += "*"
+        else:
+            tokens = tokenize(phrase)
+        if tokens:
+            terms.append(tuple(tokens))
+    return terms
+
+
+def _contains(tokens: List[str], phrase: Tuple[str, ...]) -> bool:
+    width = len(phrase)
+    return any(tuple(tokens[start:start + width]) == phrase for start in range(len(tokens) - width + 1))
+
+
+def _intersect(postings: List[array]) -> array:
+    # Walks the shortest list and binary-searches the others, so the cost
+    # follows the rarest term rather than the most common one.
+    postings = sorted(postings, key=len)
+    result = array("I")
+    for position in postings[0]:
+        for other in postings[1:]:
+            found = bisect_left(other, position)
+            if found == len(other) or other[found] != position:
+                break
+        else:
+            result.append(position)
+    return result
+
+
+class SearchIndex:
+    def __init__(self, cards: Sequence[Card], postings: Optional[Dict[str, array]] = None) -> None:
+        self.cards = cards
+        if postings is None:
+            postings = {}
+            for position in range(len(cards)):
+                for term in card_terms(cards[position]):
+                    bucket = postings.get(term)
+                    if bucket is None:
+                        bucket = postings[term] = array("I")
+                    bucket.append(position)
+        self.postings = postings
+        # Sorted single-word vocabulary, so a prefix is one bisect plus a
+        # contiguous scan.
+        self.terms = sorted(term for term in postings if " " not in term)
+        self.search = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._search)
+
+    def updated(self, cards: Sequence[Card], changes: Sequence[CardChange]) -> "SearchIndex":
+        # A new index over cards after editing and appending the changed
+        # cards. Only the postings of terms a change added or removed are
+        # copied; every other postings array is shared with this index, which
+        # stays valid for searches already running against it.
+        postings = dict(self.postings)
+        copied: Set[str] = set()
+
+        def bucket(term: str) -> array:
+            if term not in copied:
+                copied.add(term)
+                postings[term] = array("I", postings.get(term, ()))
+            return postings[term]
+
+        for position, before, after in changes:
+            old = card_terms(before) if before is not None else set()
+            new = card_terms(after)
+            for term in old - new:
+                positions = bucket(term)
+                del positions[bisect_left(positions, position)]
+            for term in new - old:
+                positions = bucket(term)
+                positions.insert(bisect_left(positions, position), position)
+        for term in copied:
+            if not postings[term]:
+                del postings[term]
+        return SearchIndex(cards, postings)
+
+    def _prefix(self, prefix: str) -> array:
+        matched = set()
+        for term in self.terms[bisect_left(self.terms, prefix):]:
+            if not term.startswith(prefix):
+                break
+            matched.update(self.postings[term])
+        return array("I", sorted(matched))
+
+    def _term(self, token: str) -> array:
+        if token.endswith("*"):
+            return self._prefix(token[:-1])
+        return self.postings.get(token, array("I"))
+
+    def _postings(self, term: Tuple[str, ...]) -> List[array]:
+        if len(term) == 1:
+            return [self._term(term[0])]
+        return [self.postings.get(" ".join(pair), array("I")) for pair in zip(term, term[1:])]
+
+    def _search(self, query: str) -> array:
+        # Card positions, ascending, that match every term of the query.
+        terms = parse_query(query)
+        if not terms:
+            return array("I")
+        candidates = _intersect([postings for term in terms for postings in self._postings(term)])
+        phrases = [term for term in terms if len(term) > 2]
+        if not phrases or not candidates:
+            return candidates
+        # Pair postings cannot tell "a b" + "b c" from "a b c", so longer
+        # phrases are confirmed on the candidates' own text.
+        return array(
+            "I",
+            (
+                position
+                for position in candidates
+                if all(
+                    any(_contains(tokenize(text), phrase) for text in card_fields(self.cards[position]))
+                    for phrase in phrases
+                )
+            ),
+        )
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from backends import Backend, MemoryBackend, SQLiteBackend, open_backend
+
+
+@pytest.fixture(params=["memory://", "sqlite://", "fakeredis://"])
+def backend(request, tmp_path) -> Backend:
+    url = request.param
+    if url == "sqlite://":
+        url += str(tmp_path / "state.db")
+    if url == "fakeredis://":
+        pytest.importorskip("fakeredis")
+    # open_backend caches one backend per URL; each test starts empty.
+    open_backend.cache_clear()
+    backend = open_backend(url)
+    if url == "fakeredis://":
+        backend.client.flushall()
+    return backend
+
+
+def test_get_set_delete(backend):
+    assert backend.get("missing") is None
+    backend.set("key", "value")
+    assert backend.get("key") == "value"
+    backend.set("key", "other")
+    assert backend.get("key") == "other"
+    backend.delete("key")
+    assert backend.get("key") is None
+
+
+def test_set_expires(backend):
+    backend.set("key", "value", ttl=1)
+    assert backend.get("key") == "value"
+    time.sleep(1.1)
+    assert backend.get("key") is None
+
+
+def test_hash_fields(backend):
+    assert backend.hgetall("hash") == {}
+    backend.hset("hash", {"a": "1", "b": 2})
+    backend.hset("hash", {"b": "3"})
+    assert backend.hgetall("hash") == {"a": "1", "b": "3"}
+    backend.delete("hash")
+    assert backend.hgetall("hash") == {}
+
+
+def test_hash_expires(backend):
+    backend.hset("hash", {"a": "1"}, ttl=1)
+    time.sleep(1.1)
+    assert backend.hgetall("hash") == {}
+
+
+def test_hincrby(backend):
+    assert backend.hincrby("counts", "hits") == 1
+    assert backend.hincrby("counts", "hits", 4) == 5
+    assert backend.hincrby("counts", "misses", -2) == -2
+    assert backend.hgetall("counts") == {"hits": "5", "misses": "-2"}
+
+
+def test_open_backend_kinds(tmp_path):
+    assert isinstance(open_backend("memory://"), MemoryBackend)
+    assert not open_backend("memory://").shared
+    sqlite = open_backend(f"sqlite://{tmp_path / 'state.db'}")
+    assert isinstance(sqlite, SQLiteBackend) and sqlite.shared
+    with pytest.raises(ValueError):
+        open_backend("ftp://nowhere")
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        Backend()
@@ -0,0 +1,90 @@
+import pytest
+
+from cardpack import HEADER, MAGIC, CardPack, PackWriter, compile_pack
+from cards import Card, PackError
+
+CARDS = [
+    Card(1, "Sanskrit is the mother of all Indian languages.", "MYTH", "Tamil is Dravidian.", ("Why?", "How?")),
+    Card(2, "Children can learn two languages at once.", "FACT", "Tamil is Dravidian.", ("Why?",), ("age:kids",)),
+    Card(0xFFFFFFFF, "Accents change over time — é, ü, हिंदी.", "FACT", "They do.", ("Why?",), ("region:india",)),
+]
+
+
+def test_pack_round_trips(tmp_path):
+    path = str(tmp_path / "cards.mfpack")
+    assert compile_pack(CARDS, path) == len(CARDS)
+    pack = CardPack(path)
+    try:
+        assert list(pack) == CARDS
+        assert pack[-1] == CARDS[-1]
+        assert pack[1:] == CARDS[1:]
+        assert [pack.id_at(position) for position in range(len(pack))] == [card.id for card in CARDS]
+        assert [pack.label_at(position) for position in range(len(pack))] == [card.label for card in CARDS]
+        assert pack.tags_at(1) == ("age:kids",)
+        with pytest.raises(IndexError):
+            pack[len(CARDS)]
+    finally:
+        pack.close()
+
+
+def test_identical_strings_are_stored_once(tmp_path):
+    path = tmp_path / "cards.mfpack"
+    compile_pack(CARDS, str(path))
+    texts = {
+        text.encode("utf-8")
+        for card in CARDS
+        for text in (card.statement, card.explanation, "\n".join(card.discussion), "\n".join(card.tags))
+    }
+    strings_at = HEADER.unpack_from(path.read_bytes(), 0)[4]
+    assert path.stat().st_size == strings_at + sum(map(len, texts))
+
+
+def test_writer_rejects_duplicate_ids(tmp_path):
+    path = tmp_path / "cards.mfpack"
+    with pytest.raises(PackError, match="duplicate card id 1"):
+        with PackWriter(str(path)) as writer:
+            writer.add(CARDS[0])
+            writer.add(CARDS[0])
+    # A failed write leaves no pack behind.
+    assert not path.exists()
+    assert not list(tmp_path.iterdir())
+
+
+def corrupt(path, **fields):
+    data = bytearray(path.read_bytes())
+    magic, version, count, records_at, strings_at = HEADER.unpack_from(data, 0)
+    values = dict(magic=magic, version=version, count=count, records_at=records_at, strings_at=strings_at)
+    values.update(fields)
+    HEADER.pack_into(data, 0, *values.values())
+    path.write_bytes(bytes(data))
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {"magic": b"NOPE"},
+        {"version": 99},
+        {"count": 1000},
+        {"records_at": 0},
+        {"strings_at": 1 << 40},
+    ],
+)
+def test_corrupt_header_is_rejected(tmp_path, fields):
+    path = tmp_path / "cards.mfpack"
+    compile_pack(CARDS, str(path))
+    corrupt(path, **fields)
+    with pytest.raises(PackError):
+        CardPack(str(path))
+
+
+def test_truncated_pack_is_rejected(tmp_path):
+    path = tmp_path / "cards.mfpack"
+    compile_pack(CARDS, str(path))
+    data = path.read_bytes()
+    assert data.startswith(MAGIC)
+    strings_at = HEADER.unpack_from(data, 0)[4]
+    # Cut anywhere up to the end of the records, as a half-written file would be.
+    for size in (0, HEADER.size - 1, HEADER.size + 8, strings_at - 1):
+        path.write_bytes(data[:size])
+        with pytest.raises(PackError):
+            CardPack(str(path))
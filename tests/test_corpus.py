@@ -0,0 +1,96 @@
+import json
+from dataclasses import replace
+
+import pytest
+
+from cards import Card
+from corpus import LiveCorpus, build_corpus
+
+CARDS = [
+    Card(1, "Sanskrit is the mother of all Indian languages.", "MYTH", "Tamil is not.", ("Why?",), ("region:india",)),
+    Card(2, "Children can learn two languages at once.", "FACT", "Bilingual infants thrive.", ("How?",), ("age:kids",)),
+    Card(3, "Some languages have no written form.", "FACT", "Most never had one.", ("Which?",), ("topic:writing",)),
+    Card(4, "Dialects are broken versions of a language.", "MYTH", "Dialects are rule-governed.", ("Why?",)),
+]
+
+
+def write_pack(path, cards):
+    with open(path, "w", encoding="utf-8") as handle:
+        for card in cards:
+            row = {
+                "id": card.id,
+                "statement": card.statement,
+                "label": card.label,
+                "explanation": card.explanation,
+                "discussion": list(card.discussion),
+                "tags": list(card.tags),
+            }
+            handle.write(json.dumps(row) + "\n")
+
+
+def assert_same_corpus(updated, rebuilt):
+    assert tuple(updated.cards) == tuple(rebuilt.cards)
+    assert updated.positions == rebuilt.positions
+    assert updated.index == rebuilt.index
+    assert updated.search.postings == rebuilt.search.postings
+    assert updated.search.terms == rebuilt.search.terms
+    assert updated.index.facets() == rebuilt.index.facets()
+
+
+@pytest.mark.parametrize(
+    "edit",
+    [
+        lambda cards: [replace(cards[0], statement="Sanskrit is one of many old Indian languages.")] + cards[1:],
+        lambda cards: cards[:2] + [replace(cards[2], tags=("topic:writing", "difficulty:easy"))] + cards[3:],
+        lambda cards: cards[:3] + [replace(cards[3], label="FACT", explanation="Edited.")],
+        lambda cards: cards + [Card(9, "Whistled languages exist.", "FACT", "Silbo Gomero.", ("Where?",))],
+        lambda cards: cards,
+    ],
+    ids=["statement", "tags", "label", "append", "unchanged"],
+)
+def test_incremental_update_matches_full_build(tmp_path, edit):
+    path = str(tmp_path / "cards.jsonl")
+    write_pack(path, CARDS)
+    previous = build_corpus(path)
+    cards = edit(list(CARDS))
+    write_pack(path, cards)
+    updated = build_corpus(path, previous)
+    # Only the edited and appended cards were rebuilt.
+    edited = [card for position, card in enumerate(cards) if position >= len(CARDS) or CARDS[position] != card]
+    assert updated.changed == len(edited)
+    assert updated.version == previous.version + 1
+    assert_same_corpus(updated, build_corpus(path))
+
+
+def test_search_follows_incremental_edits(tmp_path):
+    path = str(tmp_path / "cards.jsonl")
+    write_pack(path, CARDS)
+    previous = build_corpus(path)
+    write_pack(path, [replace(CARDS[0], statement="Latin is the mother of Romance languages.")] + CARDS[1:])
+    updated = build_corpus(path, previous)
+    assert list(updated.search.search("sanskrit")) == []
+    assert list(updated.search.search("latin")) == [0]
+    # The old snapshot is untouched.
+    assert list(previous.search.search("sanskrit")) == [0]
+
+
+def test_removed_cards_are_retired(tmp_path):
+    path = str(tmp_path / "cards.jsonl")
+    write_pack(path, CARDS)
+    previous = build_corpus(path)
+    write_pack(path, CARDS[1:])
+    updated = build_corpus(path, previous)
+    assert updated.retired == {1: CARDS[0]}
+    assert_same_corpus(updated, build_corpus(path))
+
+
+def test_live_corpus_keeps_last_good_version(tmp_path):
+    path = tmp_path / "cards.jsonl"
+    write_pack(str(path), CARDS)
+    live = LiveCorpus(str(path), interval=0)
+    path.write_text("{not json\n", encoding="utf-8")
+    assert not live.reload()
+    assert live.error and live.current.version == 1
+    write_pack(str(path), CARDS[:2])
+    assert live.reload()
+    assert live.current.version == 2 and not live.error
@@ -0,0 +1,93 @@
+from dataclasses import replace
+
+import pytest
+
+from cards import Card
+from dealer import RoundKey, RoundSpec, ShuffleCursor, build_index, deal_round, parse_share_code, permute, share_code
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100, 1000, 4097])
+@pytest.mark.parametrize("seed", [0, 1, 0xDEADBEEF])
+def test_permute_is_a_bijection(size, seed):
+    assert sorted(permute(position, size, seed) for position in range(size)) == list(range(size))
+
+
+def test_permute_depends_on_seed():
+    first = [permute(position, 100, 1) for position in range(100)]
+    second = [permute(position, 100, 2) for position in range(100)]
+    assert first != second
+
+
+def test_cursor_does_not_repeat_until_exhausted():
+    population = list(range(50))
+    cursor = ShuffleCursor(seed=7)
+    drawn = []
+    for _ in range(10):
+        drawn += cursor.draw(population, 5, set())
+    assert sorted(drawn) == population
+    # The next pass starts over with a fresh permutation.
+    assert len(cursor.draw(population, 5, set())) == 5
+
+
+def make_cards(facts, myths):
+    labels = ["FACT"] * facts + ["MYTH"] * myths
+    return [
+        Card(position + 1, f"statement {position}", label, "because", ("why?",))
+        for position, label in enumerate(labels)
+    ]
+
+
+def test_consecutive_rounds_do_not_repeat_cards():
+    index = build_index(make_cards(20, 20))
+    key = RoundKey(1234)
+    seen = []
+    for _ in range(4):
+        deck, key = deal_round(index, key, 5, 5, 10)
+        seen += deck
+    assert len(seen) == len(set(seen)) == 40
+
+
+@pytest.mark.parametrize(
+    "key",
+    [RoundKey(0), RoundKey(0xFFFFFFFF), RoundKey(42, 127, 128), RoundKey(7, 300000, 5)],
+)
+def test_round_key_code_round_trips(key):
+    assert RoundKey.from_code(key.code) == key
+    # Codes are read back case-insensitively and with separators.
+    assert RoundKey.from_code(key.code.lower()) == key
+
+
+@pytest.mark.parametrize("code", ["", "!!!", "AAAA", "AAAAAAAAAAAAAAAAAAAAAAAA"])
+def test_round_key_rejects_bad_codes(code):
+    with pytest.raises(ValueError):
+        RoundKey.from_code(code)
+
+
+def test_same_key_deals_same_deck():
+    index = build_index(make_cards(20, 20))
+    key = RoundKey(99, 3, 4)
+    assert deal_round(index, key, 3, 2, 5) == deal_round(index, RoundKey.from_code(key.code), 3, 2, 5)
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [None, RoundSpec(3, 3), RoundSpec(5, 10, ("region:india",)), RoundSpec(2, 0, ("region:india", "topic:dialects"))],
+)
+def test_share_code_round_trips(spec):
+    key = RoundKey(0xC0FFEE, 12, 34)
+    assert parse_share_code(share_code(key, spec)) == (key, spec)
+
+
+def test_round_spec_text_round_trips():
+    spec = RoundSpec(4, 6, ("difficulty:easy", "region:india"))
+    assert RoundSpec.from_text(spec.text) == spec
+    with pytest.raises(ValueError):
+        RoundSpec.from_text("x")
+
+
+def test_tag_filters_deal_only_matching_cards():
+    cards = [replace(card, tags=("region:india",) if card.id % 2 else ()) for card in make_cards(10, 10)]
+    index = build_index(cards)
+    pool = index.restrict(index.select(["region:india"]))
+    deck, _ = deal_round(pool, RoundKey(5), 3, 3, 6)
+    assert all(cards[position].id % 2 for position in deck)
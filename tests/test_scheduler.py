@@ -0,0 +1,101 @@
+import pytest
+
+from cards import MAX_CARD_ID
+from progress_store import ProgressStore
+from scheduler import BOX_INTERVALS, LeitnerScheduler
+
+
+def advance(scheduler, rounds):
+    for _ in range(rounds):
+        scheduler.next_round()
+
+
+def test_only_misses_are_scheduled():
+    scheduler = LeitnerScheduler()
+    scheduler.record(1, True)
+    assert len(scheduler) == 0 and scheduler.state(1) is None
+    scheduler.record(2, False)
+    assert len(scheduler) == 1 and scheduler.box(2) == 0
+
+
+def test_due_cards_come_back_earliest_first():
+    scheduler = LeitnerScheduler()
+    scheduler.record(30, False)
+    scheduler.next_round()
+    scheduler.record(10, False)
+    scheduler.record(20, False)
+    # Card 30 was due at round 1; 10 and 20 become due at round 2.
+    assert scheduler.take_due(10) == [30]
+    scheduler.next_round()
+    assert scheduler.take_due(10) == [10, 20, 30]
+
+
+def test_take_due_respects_the_limit():
+    scheduler = LeitnerScheduler()
+    for card_id in range(5):
+        scheduler.record(card_id, False)
+    scheduler.next_round()
+    assert scheduler.take_due(2) == [0, 1]
+    assert scheduler.take_due(10) == [2, 3, 4]
+    # Taken cards are provisionally due next round.
+    assert scheduler.take_due(10) == []
+    scheduler.next_round()
+    assert scheduler.take_due(10) == [0, 1, 2, 3, 4]
+
+
+def test_correct_answers_move_cards_up_a_box():
+    scheduler = LeitnerScheduler()
+    scheduler.record(7, False)
+    for box in range(1, len(BOX_INTERVALS) + 2):
+        advance(scheduler, BOX_INTERVALS[scheduler.box(7)])
+        assert scheduler.take_due(1) == [7]
+        scheduler.record(7, True)
+        assert scheduler.box(7) == min(box, len(BOX_INTERVALS) - 1)
+    scheduler.record(7, False)
+    assert scheduler.box(7) == 0
+
+
+def test_rescheduling_leaves_no_duplicates():
+    scheduler = LeitnerScheduler()
+    for _ in range(500):
+        scheduler.record(1, False)
+        scheduler.record(2, False)
+    scheduler.next_round()
+    assert scheduler.take_due(10) == [1, 2]
+    # Stale heap entries are compacted away.
+    assert len(scheduler.heap) <= 2 * len(scheduler) + 64
+
+
+def test_text_round_trips():
+    scheduler = LeitnerScheduler()
+    for card_id in (5, MAX_CARD_ID, 0, 12):
+        scheduler.record(card_id, False)
+        scheduler.next_round()
+    scheduler.record(12, True)
+    restored = LeitnerScheduler.from_text(scheduler.text)
+    assert restored.round == scheduler.round
+    assert restored.cards == scheduler.cards
+    assert restored.take_due(10) == scheduler.take_due(10)
+    assert LeitnerScheduler.from_text(LeitnerScheduler().text).cards == {}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProgressStore(str(tmp_path / "progress.db"))
+
+
+def test_store_saves_schedule_per_card(store, tmp_path):
+    scheduler = LeitnerScheduler()
+    assert store.load_schedule("learner") is None
+    for card_id in (3, 9):
+        scheduler.record(card_id, False)
+        store.save_review("learner", card_id, scheduler.state(card_id))
+    scheduler.next_round()
+    store.save_review_round("learner", scheduler.round)
+    # Pending rows are visible before the writer commits them...
+    assert store.load_schedule("learner").cards == scheduler.cards
+    assert store.flush()
+    # ...and read back from the database afterwards.
+    restored = ProgressStore(str(tmp_path / "progress.db")).load_schedule("learner")
+    assert (restored.round, restored.cards) == (scheduler.round, scheduler.cards)
+    assert store.load_schedule("someone else") is None
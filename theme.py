@@ -0,0 +1,20 @@
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+
+THEME_PATH = Path(__file__).resolve().parent / "static" / "theme.css"
+# Served by Streamlit's static file handler (server.enableStaticServing).
+THEME_URL = "app/static/theme.css"
+
+
+@lru_cache(maxsize=None)
+def theme_css() -> str:
+    return THEME_PATH.read_text(encoding="utf-8")
+
+
+@lru_cache(maxsize=None)
+def theme_url() -> str:
+    # The content hash busts browser caches when the stylesheet changes, so it
+    # can be cached indefinitely and each rerun only sends a short <link> tag.
+    digest = hashlib.sha1(theme_css().encode("utf-8")).hexdigest()[:10]
+    return f"{THEME_URL}?v={digest}"
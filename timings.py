@@ -0,0 +1,211 @@
+"""Stage timings for the page script.
+
+Each stage of a rerun (page setup, theme link, card panel, sidebar, button
+callbacks) is timed into a process-wide ring buffer holding the most recent
+SAMPLES measurements. Summaries are served three ways: per-stage p50/p95 for
+the admin sidebar panel, a Prometheus text file for a node exporter's textfile
+collector (by default metrics/metrics.prom, outside the static/ folder the app
+serves publicly), and, when profiling is on, cProfile captures of sampled
+reruns that turn out slower than SLOW_RERUN_MS.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+APP_DIR = Path(__file__).resolve().parent
+SAMPLES = 8192
+METRICS_FILE = os.environ.get("MYTH_OR_FACT_METRICS_FILE", str(APP_DIR / "metrics" / "metrics.prom"))
+METRICS_INTERVAL = 10.0
+PROFILE_DIR = Path(os.environ.get("MYTH_OR_FACT_PROFILE_DIR", APP_DIR / "profiles"))
+PROFILE_SAMPLE_RATE = float(os.environ.get("MYTH_OR_FACT_PROFILE_SAMPLE", "0.1"))
+SLOW_RERUN_MS = float(os.environ.get("MYTH_OR_FACT_SLOW_RERUN_MS", "250"))
+PROFILES_KEPT = 20
+# A capture still open after this long belongs to a rerun that was interrupted
+# before it could finish, and is dropped.
+PROFILE_ABANDONED_SECONDS = 60.0
+
+F = TypeVar("F", bound=Callable)
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Rerun:
+    __slots__ = ("started", "profiler")
+
+    def __init__(self, profiler: Optional[cProfile.Profile]) -> None:
+        self.started = time.perf_counter()
+        self.profiler = profiler
+
+
+class StageTimings:
+    # Appends go to a bounded deque, which is thread-safe without a lock, so
+    # timing a stage costs two perf_counter calls and one append. Running
+    # totals for the Prometheus _sum/_count series sit behind a small lock.
+    def __init__(self, samples: int = SAMPLES) -> None:
+        self._samples: Deque[Tuple[str, float]] = deque(maxlen=samples)
+        self._totals: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._written_at = 0.0
+        # The rerun being profiled. One capture at a time: Python 3.12 refuses
+        # to enable a second profiler while another thread's is active.
+        self._profiled: Optional[Rerun] = None
+        self.profiling = os.environ.get("MYTH_OR_FACT_PROFILE", "") == "1"
+
+    def record(self, stage: str, seconds: float) -> None:
+        self._samples.append((stage, seconds))
+        with self._lock:
+            totals = self._totals.get(stage)
+            if totals is None:
+                totals = self._totals[stage] = [0, 0.0]
+            totals[0] += 1
+            totals[1] += seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def timed(self, name: Optional[str] = None) -> Callable[[F], F]:
+        def decorate(function: F) -> F:
+            stage = name or function.__name__
+
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(stage):
+                    return function(*args, **kwargs)
+
+            return wrapper  # type: ignore[return-value]
+
+        return decorate
+
+    @contextmanager
+    def rerun(self) -> Iterator[None]:
+        # Times (and may profile) a block as a whole rerun, for fragment
+        # reruns that run one function instead of the page script.
+        rerun = self.start_rerun()
+        try:
+            yield
+        finally:
+            self.finish_rerun(rerun)
+
+    def start_rerun(self) -> Rerun:
+        # When profiling is on, a sample of reruns runs under cProfile; only
+        # the slow ones are kept. A sampled rerun that overlaps another capture
+        # is simply not profiled.
+        rerun = Rerun(None)
+        if not self.profiling or random.random() >= PROFILE_SAMPLE_RATE:
+            return rerun
+        with self._lock:
+            held = self._profiled
+            if held is not None and rerun.started - held.started < PROFILE_ABANDONED_SECONDS:
+                return rerun
+            if held is not None and held.profiler is not None:
+                held.profiler.disable()
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiling tool is active.
+                self._profiled = None
+                return rerun
+            rerun.profiler = profiler
+            self._profiled = rerun
+        return rerun
+
+    def finish_rerun(self, rerun: Rerun) -> None:
+        seconds = time.perf_counter() - rerun.started
+        if rerun.profiler is not None:
+            rerun.profiler.disable()
+            with self._lock:
+                if self._profiled is rerun:
+                    self._profiled = None
+            if seconds * 1000 >= SLOW_RERUN_MS:
+                save_profile(rerun.profiler, seconds)
+        self.record("rerun", seconds)
+        with self._lock:
+            due = bool(METRICS_FILE) and time.monotonic() - self._written_at >= METRICS_INTERVAL
+            if due:
+                self._written_at = time.monotonic()
+        if due:
+            self.write_metrics(METRICS_FILE)
+
+    def summary(self) -> List[Dict[str, float]]:
+        by_stage: Dict[str, List[float]] = {}
+        for stage, seconds in list(self._samples):
+            by_stage.setdefault(stage, []).append(seconds)
+        rows = []
+        for stage, samples in sorted(by_stage.items()):
+            samples.sort()
+            rows.append(
+                {
+                    "stage": stage,
+                    "samples": len(samples),
+                    "p50_ms": percentile(samples, 0.50) * 1000,
+                    "p95_ms": percentile(samples, 0.95) * 1000,
+                }
+            )
+        return rows
+
+    def prometheus(self) -> str:
+        with self._lock:
+            totals = {stage: tuple(values) for stage, values in self._totals.items()}
+        lines = [
+            "# HELP myth_or_fact_stage_seconds Time spent in each stage of the page script.",
+            "# TYPE myth_or_fact_stage_seconds summary",
+        ]
+        for row in self.summary():
+            stage = row["stage"]
+            for quantile, key in (("0.5", "p50_ms"), ("0.95", "p95_ms")):
+                value = row[key] / 1000
+                lines.append(f'myth_or_fact_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {value:.6f}')
+        for stage, (count, total) in sorted(totals.items()):
+            lines.append(f'myth_or_fact_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'myth_or_fact_stage_seconds_count{{stage="{stage}"}} {int(count)}')
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self, path: str) -> None:
+        # Written to a temporary file and renamed, so a scrape never reads a
+        # half-written file. The name is per thread as well as per process.
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temporary = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}")
+        temporary.write_text(self.prometheus(), encoding="utf-8")
+        os.replace(temporary, target)
+
+
+def save_profile(profiler: cProfile.Profile, seconds: float) -> Path:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    path = PROFILE_DIR / f"rerun-{time.strftime('%Y%m%d-%H%M%S')}-{int(seconds * 1000)}ms-{os.getpid()}.prof"
+    profiler.dump_stats(str(path))
+    for stale in list_profiles()[PROFILES_KEPT:]:
+        stale.unlink(missing_ok=True)
+    return path
+
+
+def list_profiles() -> List[Path]:
+    # Newest first.
+    return sorted(PROFILE_DIR.glob("rerun-*.prof"), key=lambda path: path.stat().st_mtime, reverse=True)
+
+
+def profile_report(path: Path, limit: int = 15) -> str:
+    output = io.StringIO()
+    pstats.Stats(str(path), stream=output).strip_dirs().sort_stats("cumulative").print_stats(limit)
+    return output.getvalue()
+
+
+TIMINGS = StageTimings()
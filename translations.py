@@ -0,0 +1,139 @@
+"""Per-locale translations of card text.
+
+Each locale is a separate pack file, packs/i18n/<locale>.jsonl (or .csv), with
+one row per translated card: `id` plus the translated `statement`,
+`explanation` and `discussion`. Labels and tags come from the base pack, and
+cards missing from a locale fall back to the base text.
+
+Locales are loaded on first use and kept in an LRU bounded by an estimate of
+their size in memory, so only languages in active use stay resident.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from cards import DISCUSSION_SEPARATOR, PACK_DIR, Card, PackError, read_rows
+
+LOCALE_DIR = Path(os.environ.get("MYTH_OR_FACT_LOCALE_DIR", PACK_DIR / "i18n"))
+BASE_LOCALE = "en"
+CACHE_BYTES = int(os.environ.get("MYTH_OR_FACT_LOCALE_CACHE_MB", "64")) * 1024 * 1024
+LOCALE_NAMES = {
+    "en": "English",
+    "es": "Español",
+    "hi": "हिन्दी",
+    "ta": "தமிழ்",
+}
+
+Translation = Tuple[str, str, Tuple[str, ...]]
+
+
+def available_locales(directory: str = str(LOCALE_DIR)) -> Dict[str, str]:
+    # Locale code to display name; only lists files, nothing is loaded.
+    locales = {BASE_LOCALE: LOCALE_NAMES[BASE_LOCALE]}
+    for path in sorted(Path(directory).glob("*.*")):
+        if path.suffix in (".jsonl", ".csv"):
+            locales.setdefault(path.stem, LOCALE_NAMES.get(path.stem, path.stem))
+    return locales
+
+
+def read_translations(path: str) -> Dict[int, Translation]:
+    translations: Dict[int, Translation] = {}
+    for row_no, row in enumerate(read_rows(path), 1):
+        try:
+            discussion = row.get("discussion") or ()
+            if isinstance(discussion, str):
+                discussion = discussion.split(DISCUSSION_SEPARATOR)
+            translations[int(row["id"])] = (
+                str(row["statement"]).strip(),
+                str(row["explanation"]).strip(),
+                tuple(str(item).strip() for item in discussion if str(item).strip()),
+            )
+        except (KeyError, TypeError, ValueError) as exc:
+            raise PackError(f"{path} row {row_no}: {exc}") from exc
+    return translations
+
+
+def _footprint(translations: Dict[int, Translation]) -> int:
+    size = sys.getsizeof(translations)
+    for statement, explanation, discussion in translations.values():
+        size += sys.getsizeof(statement) + sys.getsizeof(explanation) + sys.getsizeof(discussion)
+        size += sum(sys.getsizeof(item) for item in discussion)
+    return size
+
+
+class LocaleCache:
+    # Shared by every session in the process. A locale is read from disk the
+    # first time it is asked for; the least recently used ones are dropped once
+    # the total estimated size passes max_bytes.
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.loads = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[Dict[int, Translation], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, locale: str) -> Optional[Path]:
+        for suffix in (".jsonl", ".csv"):
+            path = self.directory / f"{locale}{suffix}"
+            if path.is_file():
+                return path
+        return None
+
+    def get(self, locale: str) -> Dict[int, Translation]:
+        with self._lock:
+            entry = self._entries.get(locale)
+            if entry is not None:
+                self._entries.move_to_end(locale)
+                return entry[0]
+        path = self._path(locale)
+        translations = read_translations(str(path)) if path else {}
+        size = _footprint(translations)
+        with self._lock:
+            if locale in self._entries:
+                # Another session loaded it meanwhile.
+                self._entries.move_to_end(locale)
+                return self._entries[locale][0]
+            self.loads += 1
+            self._entries[locale] = (translations, size)
+            self._bytes += size
+            # The locale just loaded is kept even if it alone exceeds the cap.
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+            return translations
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "locales": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+
+@lru_cache(maxsize=None)
+def open_locales(directory: str = str(LOCALE_DIR), max_bytes: int = CACHE_BYTES) -> LocaleCache:
+    return LocaleCache(directory, max_bytes)
+
+
+def localize(card: Card, locale: str, cache: Optional[LocaleCache] = None) -> Card:
+    # The card with its text in locale; the id, label and tags are unchanged,
+    # so decks, scores and statistics do not depend on the language shown.
+    if locale == BASE_LOCALE:
+        return card
+    translation = (cache or open_locales()).get(locale).get(card.id)
+    if translation is None:
+        return card
+    statement, explanation, discussion = translation
+    return replace(card, statement=statement, explanation=explanation, discussion=discussion or card.discussion)